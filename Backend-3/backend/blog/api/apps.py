@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from api.cache import check_shared_cache, shared_cache_features
+
+        import api.signals  # noqa: F401
+        check_shared_cache(shared_cache_features())
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_THREADS,
+    thread_name_prefix='async-read',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Выполняет DRF-вьюху в потоке пула. Как воркер gunicorn, поток
+    держит своё соединение с БД и закрывает устаревшее до и после
+    запроса. Замеры и statement_timeout запроса приходят в поток с
+    контекстом (см. api.timing.query_wrapper), ответ рендерится здесь
+    же.
+    """
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """
+    Асинхронная обёртка над view-функцией роутера DRF. Безопасные
+    запросы выполняются в пуле из ASYNC_READ_THREADS потоков и не
+    ждут общий поток синхронного кода Django, остальные идут как
+    обычная синхронная вьюха.
+    """
+    read = sync_to_async(
+        partial(run_view, view), thread_sensitive=False, executor=executor
+    )
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return async_view
+
+
+def async_read_urls(urlpatterns):
+    """
+    Заменяет view-функции роутера на асинхронные там, где GET ведёт
+    к действию из async_read_actions вьюсета.
+    """
+    patterns = []
+    for pattern in urlpatterns:
+        view = pattern.callback
+        actions = getattr(getattr(view, 'cls', None), 'async_read_actions', ())
+        if (getattr(view, 'actions', None) or {}).get('get') in actions:
+            pattern = URLPattern(
+                pattern.pattern, async_read_view(view),
+                pattern.default_args, pattern.name,
+            )
+        patterns.append(pattern)
+    return patterns
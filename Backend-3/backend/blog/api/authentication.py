@@ -0,0 +1,120 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User
+
+DENIED_JTI_KEY = 'auth:denied_jti:{}'
+REVOKED_BEFORE_KEY = 'auth:revoked_before:{}'
+USER_CLAIMS = (
+    'email', 'username', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+LOCAL_CACHE_SIZE = 10000
+
+# Результаты проверки отзыва в памяти процесса: ключ -> (истекает, значение).
+_local = {}
+
+
+def cached_get(key):
+    """
+    Значение из общего кэша, запомненное в процессе на
+    JWT_REVOCATION_CACHE_TTL секунд.
+    """
+    now = time.monotonic()
+    entry = _local.get(key)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    value = cache.get(key)
+    if len(_local) >= LOCAL_CACHE_SIZE:
+        _local.clear()
+    _local[key] = (now + settings.JWT_REVOCATION_CACHE_TTL, value)
+    return value
+
+
+def issue_tokens(user):
+    """Пара refresh/access с данными пользователя в claims."""
+    refresh = RefreshToken.for_user(user)
+    refresh['iat'] = time.time()
+    for claim in USER_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    return refresh
+
+
+def deny_token(token):
+    """
+    Заносит jti токена в denylist до окончания его срока действия.
+    Запись атомарна (cache.add): False, если токен уже был в denylist,
+    поэтому один refresh-токен обменивается только один раз.
+    """
+    key = DENIED_JTI_KEY.format(token['jti'])
+    added = cache.add(key, True, max(int(token['exp'] - time.time()), 1))
+    _local.pop(key, None)
+    return added
+
+
+def revoke_user_tokens(user_id):
+    """Отзывает все токены пользователя, выпущенные до этого момента."""
+    key = REVOKED_BEFORE_KEY.format(user_id)
+    cache.set(
+        key, time.time(),
+        int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+    )
+    _local.pop(key, None)
+
+
+def check_not_revoked(token):
+    if cached_get(DENIED_JTI_KEY.format(token['jti'])):
+        raise InvalidToken('Токен отозван.')
+    revoked_before = cached_get(
+        REVOKED_BEFORE_KEY.format(token[api_settings.USER_ID_CLAIM])
+    )
+    if revoked_before is not None and token.get('iat', 0) <= revoked_before:
+        raise InvalidToken('Токен отозван.')
+
+
+def user_from_claims(token):
+    """Пользователь, собранный из claims без запроса к БД."""
+    try:
+        user = User(
+            id=token[api_settings.USER_ID_CLAIM],
+            **{claim: token[claim] for claim in USER_CLAIMS},
+        )
+    except KeyError:
+        raise InvalidToken('В токене нет данных пользователя.')
+    user._state.adding = False
+    user._state.db = 'default'
+    if not user.is_active:
+        raise AuthenticationFailed('Пользователь неактивен.')
+    return user
+
+
+class SignedTokenAuthentication(JWTAuthentication):
+    """
+    Аутентификация по подписанному access-токену (Bearer). Для
+    безопасных методов пользователь восстанавливается из claims без
+    запроса к БД, для изменяющих загружается из БД. Отзыв работает
+    через denylist jti и метку времени отзыва всех токенов
+    пользователя в общем кэше (см. api.cache.check_shared_cache).
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        token = self.get_validated_token(raw_token)
+        check_not_revoked(token)
+        if request.method in SAFE_METHODS:
+            return user_from_claims(token), token
+        return self.get_user(token), token
@@ -0,0 +1,186 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+VERSION_KEY = 'api:version:{}'
+LAST_WRITE_KEY = 'api:last_write'
+
+
+def get_version(scope):
+    """Текущая версия области кэша, например 'recipes' или 'tags'."""
+    return cache.get_or_set(
+        VERSION_KEY.format(scope), time.time_ns(), timeout=None
+    )
+
+
+def bump_version(*scopes):
+    """
+    Инвалидирует все ответы, зависящие от областей scopes.
+    Если версия вытеснена из кэша, она начинается заново
+    со значения, которое не совпадёт ни с одним старым ключом.
+    """
+    cache.set(LAST_WRITE_KEY, time.time(), timeout=None)
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+# Кэши отдельного процесса.
+LOCAL_CACHES = (LocMemCache, DummyCache)
+# Кэши, где add() — проверка и запись двумя шагами, а записи
+# вытесняются случайно по достижении MAX_ENTRIES.
+NON_ATOMIC_CACHES = LOCAL_CACHES + (FileBasedCache, DatabaseCache)
+
+
+def shared_cache_features():
+    """Включённые настройки, которые держат общее состояние в кэше."""
+    return [
+        feature for feature, enabled in (
+            ('API_CACHE', settings.API_CACHE_ENABLED),
+            ('RECIPE_CARD_CACHE', settings.RECIPE_CARD_CACHE_ENABLED),
+            ('DB_REPLICA_HOSTS', bool(settings.DATABASE_REPLICAS)),
+            ('JWT_AUTH', settings.JWT_AUTH_ENABLED),
+        ) if enabled
+    ]
+
+
+def check_shared_cache(features):
+    """
+    Версии ответов и карточек, отметки записей для чтения с основной
+    БД и отзыв токенов меняются в одном воркере, а читаются во всех.
+    В кэше отдельного процесса остальные воркеры их не видят и сутки
+    отдают устаревшие данные, поэтому такие настройки требуют общего
+    кэша. Denylist токенов к тому же опирается на атомарный add() и не
+    должен вытесняться: для JWT_AUTH нужен memcached или redis.
+    """
+    backend = caches['default']
+    for required, rejected in (
+        ([feature for feature in features if feature == 'JWT_AUTH'],
+         NON_ATOMIC_CACHES),
+        (features, LOCAL_CACHES),
+    ):
+        if required and isinstance(backend, rejected):
+            raise ImproperlyConfigured(
+                f'Настройки {", ".join(required)} требуют общего кэша '
+                f'(CACHE_BACKEND), а не {type(backend).__name__}.'
+            )
+
+
+def is_conditional(request):
+    """Клиент прислал If-None-Match или If-Modified-Since."""
+    return (
+        'HTTP_IF_NONE_MATCH' in request.META
+        or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """ETag и Last-Modified (секунды Unix) в заголовках ответа."""
+    if etag is not None:
+        response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304 с валидаторами, если у клиента актуальная версия."""
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+class AnonymousCacheMixin:
+    """
+    Кэширует сериализованные ответы list и retrieve для анонимных
+    пользователей и выставляет Cache-Control и Vary: Authorization.
+    Ключ включает версии областей cache_scopes, поэтому запись
+    любой из связанных моделей сбрасывает кэш без перебора ключей.
+    Вместе с данными сохраняются ETag и Last-Modified ответа: условный
+    запрос при попадании в кэш проверяется без обращения к БД.
+    """
+
+    cache_scopes = ()
+    cache_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def is_cacheable(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and self.action in self.cache_actions
+            and not request.user.is_authenticated
+        )
+
+    def get_cache_key(self, request):
+        versions = ':'.join(
+            str(get_version(scope)) for scope in self.cache_scopes
+        )
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return (
+            f'api:response:v2:{self.basename}:{self.action}:'
+            f'{versions}:{path}'
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not (settings.API_CACHE_ENABLED and self.is_cacheable(request)):
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            data, etag, last_modified = cached
+            return not_modified(request, etag, last_modified) or (
+                set_validators(Response(data), etag, last_modified)
+            )
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, (
+                response.data,
+                response.get('ETag'),
+                parse_http_date_safe(response.get('Last-Modified', '')),
+            ), settings.API_CACHE_TIMEOUT)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if (request.method in SAFE_METHODS
+                and self.action in self.cache_actions):
+            patch_vary_headers(response, ('Authorization',))
+            if response.status_code != 200:
+                return response
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, max_age=0)
+            else:
+                patch_cache_control(
+                    response, public=True, max_age=settings.API_CACHE_MAX_AGE
+                )
+        return response
@@ -0,0 +1,160 @@
+import hashlib
+import time
+
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from rest_framework.response import Response
+
+from api.cache import get_version, is_conditional, not_modified, set_validators
+from api.pagination import list_state
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.popularity import ORDERINGS
+from users.models import Subscription, User
+
+
+def make_etag(*parts):
+    state = ':'.join(str(part) for part in parts)
+    return f'W/"{hashlib.md5(state.encode()).hexdigest()}"'
+
+
+def relation_stats(model, field='user'):
+    """Количество и максимальный id связей пользователя с моделью."""
+    queryset = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field)
+    return (
+        Subquery(queryset.annotate(value=Count('pk')).values('value')),
+        Subquery(queryset.annotate(value=Max('pk')).values('value')),
+    )
+
+
+def personal_state(user):
+    """
+    Состояние избранного, списка покупок и подписок пользователя
+    одним запросом: добавление или удаление любой связи его меняет.
+    """
+    if user.is_anonymous:
+        return ()
+    annotations = {}
+    for name, model in (
+        ('favorites', Favorite),
+        ('shopping_cart', ShoppingCart),
+        ('subscriptions', Subscription),
+    ):
+        count, max_id = relation_stats(model)
+        annotations[f'{name}_count'] = count
+        annotations[f'{name}_max'] = max_id
+    return User.objects.filter(pk=user.pk).annotate(
+        **annotations
+    ).values_list(*annotations).get()
+
+
+class ConditionalRecipeMixin:
+    """
+    ETag для списка и карточки рецепта и Last-Modified для карточки.
+    Валидаторы считаются по updated_at без сериализации. До обработки
+    запроса они считаются, только если клиент прислал If-None-Match
+    или If-Modified-Since, и при совпадении отдаётся 304. Обычный ответ
+    получает ETag из данных, которые список и карточка всё равно
+    читают: COUNT и Max(updated_at) одним запросом пагинатора, updated_at
+    загруженного рецепта. Last-Modified выставляется только анонимам:
+    для пользователя ответ зависит ещё и от его избранного, которое по
+    дате не отследить.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if is_conditional(request):
+            response = not_modified(
+                request, self.get_list_etag(request, list_state(queryset)),
+                None,
+            )
+            if response is not None:
+                return response
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_serializer(queryset, many=True).data)
+        response = self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+        # Удаление рецепта не сдвигает Max(updated_at), поэтому список
+        # проверяется только по ETag, куда входит и количество.
+        return set_validators(response, self.get_list_etag(
+            request, self.paginator.page.paginator.state
+        ), None)
+
+    def get_list_etag(self, request, state):
+        return make_etag(
+            request.get_full_path(), state['count'], state['last_modified'],
+            *personal_state(request.user),
+            *self.get_ordering_state(request),
+        )
+
+    @staticmethod
+    def get_ordering_state(request):
+        """Порядок по рейтингу меняется после каждого его пересчёта."""
+        if request.query_params.get('ordering') in ORDERINGS:
+            return (get_version('popularity'),)
+        return ()
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_field]
+        state = None
+        if is_conditional(request):
+            state = self.get_detail_state(request.user, pk)
+            if state is not None:
+                response = not_modified(
+                    request, make_etag(pk, *state),
+                    self.get_last_modified(request, state[0]),
+                )
+                if response is not None:
+                    return response
+        response = super().retrieve(request, *args, **kwargs)
+        if state is None and request.user.is_authenticated:
+            state = self.get_detail_state(request.user, pk)
+        elif state is None:
+            state = (self.object_updated_at,)
+        return set_validators(
+            response, make_etag(pk, *state),
+            self.get_last_modified(request, state[0]),
+        )
+
+    def get_object(self):
+        instance = super().get_object()
+        self.object_updated_at = instance.updated_at
+        return instance
+
+    @staticmethod
+    def get_last_modified(request, updated_at):
+        """
+        Last-Modified в целых секундах отдаётся, только когда секунда
+        updated_at уже прошла: иначе правка в ту же секунду не сдвинула
+        бы его, и If-Modified-Since вернул бы устаревшую версию.
+        """
+        if request.user.is_authenticated:
+            return None
+        last_modified = int(updated_at.timestamp())
+        if time.time() < last_modified + 1:
+            return None
+        return last_modified
+
+    def get_detail_state(self, user, pk):
+        """updated_at рецепта и персональные флаги одним запросом."""
+        try:
+            queryset = Recipe.objects.filter(pk=pk)
+            if user.is_anonymous:
+                return queryset.values_list('updated_at').first()
+            return queryset.annotate(
+                favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                subscribed=Exists(Subscription.objects.filter(
+                    user=user, author=OuterRef('author_id')
+                )),
+            ).values_list(
+                'updated_at', 'favorited', 'in_shopping_cart', 'subscribed'
+            ).first()
+        except (TypeError, ValueError):
+            return None
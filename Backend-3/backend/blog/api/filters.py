@@ -1,14 +1,30 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import filters, FilterSet
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
 
 
 class RecipeFilter(FilterSet):
+    """
+    Все параметры списка рецептов одним запросом. Связи проверяются
+    через Exists по уникальным индексам (user, recipe) и (recipe, tag),
+    а не через JOIN: строки рецептов не размножаются, и DISTINCT не
+    нужен.
+    """
 
+    cooking_time = filters.RangeFilter()
+    name = filters.CharFilter(lookup_expr='icontains')
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='filter_tags',
     )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
@@ -19,17 +35,31 @@ class RecipeFilter(FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'cooking_time', 'name', 'tags',
+            'is_favorited', 'is_in_shopping_cart',
+        )
 
-    def get_is_favorited(self, queryset, name, value):
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тегов."""
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=value
+        )))
+
+    def filter_user_relation(self, queryset, model, value):
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(Exists(model.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk')
+            )))
         return queryset
 
+    def get_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorite, value)
+
     def get_is_in_shopping_cart(self, queryset, name, value):
-        if self.request.user.is_authenticated and value:
-            return queryset.filter(shopping_cart__user=self.request.user)
-        return queryset
+        return self.filter_user_relation(queryset, ShoppingCart, value)
 
 
 class IngredientFilter(FilterSet):
@@ -0,0 +1,208 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Exists,
+    OuterRef,
+    Prefetch,
+    prefetch_related_objects,
+)
+
+from api.cache import bump_version, get_version
+from recipes.signals import collect_on_commit
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeCard,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription
+
+FRAGMENT_KEY = 'api:recipe_card:{}:{}'
+FRAGMENTS_SCOPE = 'recipe_cards'
+PROJECTION_CHUNK_SIZE = 500
+# Перестройка проекции идёт после отложенного сдвига updated_at.
+PROJECTION_ORDER = 1
+
+
+def fragment_keys(recipe_ids):
+    version = get_version(FRAGMENTS_SCOPE)
+    return {
+        recipe_id: FRAGMENT_KEY.format(version, recipe_id)
+        for recipe_id in recipe_ids
+    }
+
+
+def invalidate_fragments(recipe_ids):
+    """Удаляет карточки только указанных рецептов."""
+    cache.delete_many(fragment_keys(recipe_ids).values())
+
+
+def invalidate_all_fragments():
+    """Сбрасывает все карточки, например после правки тега."""
+    bump_version(FRAGMENTS_SCOPE)
+
+
+def render_public(recipes):
+    """
+    Публичная часть карточки: без request в контексте персональные
+    поля равны False, а картинка отдаётся относительным URL. Теги и
+    ингредиенты упорядочены по id, как и в RECIPE_JSON_FAST_PATH.
+    """
+    from api.serializers import RecipesReadSerializer
+
+    prefetch_related_objects(
+        recipes, 'author',
+        Prefetch('tags', queryset=Tag.objects.order_by('id')),
+        Prefetch(
+            'recipeingredients',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient'
+            ).order_by('id'),
+        ),
+    )
+    return {
+        recipe.id: dict(RecipesReadSerializer(recipe, context={}).data)
+        for recipe in recipes
+    }
+
+
+def get_projected(recipes):
+    """Актуальные карточки из таблицы RecipeCard одним запросом."""
+    updated_at = {recipe.id: recipe.updated_at for recipe in recipes}
+    return {
+        recipe_id: json.loads(data)
+        for recipe_id, data, recipe_updated_at in RecipeCard.objects.filter(
+            recipe_id__in=list(updated_at)
+        ).values_list('recipe_id', 'data', 'recipe_updated_at')
+        if recipe_updated_at == updated_at[recipe_id]
+    }
+
+
+@transaction.atomic
+def save_projection(recipes, rendered):
+    """Записывает карточки вместе с updated_at, по которому они собраны."""
+    RecipeCard.objects.filter(
+        recipe_id__in=[recipe.id for recipe in recipes]
+    ).delete()
+    RecipeCard.objects.bulk_create(
+        (
+            RecipeCard(
+                recipe_id=recipe.id,
+                data=json.dumps(rendered[recipe.id], ensure_ascii=False),
+                recipe_updated_at=recipe.updated_at,
+            )
+            for recipe in recipes if recipe.id in rendered
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def rebuild_projection(recipe_ids):
+    """Пересобирает строки RecipeCard рецептов пачками."""
+    recipe_ids = sorted(recipe_ids)
+    rebuilt = 0
+    for start in range(0, len(recipe_ids), PROJECTION_CHUNK_SIZE):
+        recipes = list(Recipe.objects.filter(
+            pk__in=recipe_ids[start:start + PROJECTION_CHUNK_SIZE]
+        ))
+        save_projection(recipes, render_public(recipes))
+        rebuilt += len(recipes)
+    return rebuilt
+
+
+def update_projection(recipe_ids):
+    """
+    Пересобирает строки проекции после коммита записи, которая меняет
+    карточки: строка сохраняется с уже зафиксированным updated_at.
+    """
+    if settings.RECIPE_CARD_PROJECTION_ENABLED:
+        collect_on_commit(rebuild_projection, recipe_ids, PROJECTION_ORDER)
+
+
+def render_cards(recipes):
+    """
+    Публичные карточки из проекции RecipeCard. Проекцию пишут только
+    записи (update_projection) и rebuild_recipe_cards; чтение её не
+    меняет, а устаревшие и отсутствующие строки рисует заново.
+    """
+    if not settings.RECIPE_CARD_PROJECTION_ENABLED:
+        return render_public(recipes)
+    cards = get_projected(recipes)
+    stale = [recipe for recipe in recipes if recipe.id not in cards]
+    if stale:
+        cards.update(render_public(stale))
+    return cards
+
+
+def get_fragments(recipes):
+    """Карточки из кэша одним get_many, промахи дорисовываются пачкой."""
+    if not settings.RECIPE_CARD_CACHE_ENABLED:
+        return render_cards(recipes)
+    keys = fragment_keys(recipe.id for recipe in recipes)
+    cached = cache.get_many(keys.values())
+    fragments = {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached
+    }
+    misses = [recipe for recipe in recipes if recipe.id not in fragments]
+    if misses:
+        rendered = render_cards(misses)
+        cache.set_many(
+            {keys[recipe_id]: card for recipe_id, card in rendered.items()},
+            settings.RECIPE_CARD_CACHE_TIMEOUT,
+        )
+        fragments.update(rendered)
+    return fragments
+
+
+def get_personal_flags(recipe_ids, user):
+    """Персональные флаги для всех рецептов страницы одним запросом."""
+    if user is None or user.is_anonymous or not recipe_ids:
+        return {}
+    flags = Recipe.objects.filter(pk__in=recipe_ids).annotate(
+        favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+        ),
+        subscribed=Exists(
+            Subscription.objects.filter(
+                user=user, author=OuterRef('author_id')
+            )
+        ),
+    ).values_list('pk', 'favorited', 'in_shopping_cart', 'subscribed')
+    return {
+        recipe_id: (favorited, in_shopping_cart, subscribed)
+        for recipe_id, favorited, in_shopping_cart, subscribed in flags
+    }
+
+
+def get_recipe_cards(recipes, context):
+    """
+    Собирает карточки рецептов: публичный фрагмент из кэша плюс
+    персональные флаги текущего пользователя.
+    """
+    recipes = list(recipes)
+    request = context.get('request')
+    user = getattr(request, 'user', None)
+    fragments = get_fragments(recipes)
+    flags = get_personal_flags([recipe.id for recipe in recipes], user)
+    cards = []
+    for recipe in recipes:
+        card = dict(fragments[recipe.id])
+        favorited, in_shopping_cart, subscribed = flags.get(
+            recipe.id, (False, False, False)
+        )
+        card['is_favorited'] = favorited
+        card['is_in_shopping_cart'] = in_shopping_cart
+        card['author'] = {**card['author'], 'is_subscribed': subscribed}
+        if request is not None and card['image'] is not None:
+            card['image'] = request.build_absolute_uri(card['image'])
+        cards.append(card)
+    return cards
@@ -0,0 +1,102 @@
+import os
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LABELS = ('view', 'action', 'method')
+
+REQUEST_LATENCY = Histogram(
+    'api_request_duration_seconds',
+    'Время обработки запроса',
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    'api_requests_total',
+    'Количество запросов',
+    LABELS + ('status',),
+)
+DB_QUERIES = Histogram(
+    'api_db_queries',
+    'Количество SQL-запросов на один запрос',
+    LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_TIME = Histogram(
+    'api_db_duration_seconds',
+    'Время SQL-запросов в рамках одного запроса',
+    LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+ERRORS = Counter(
+    'api_errors_total',
+    'Количество ответов с кодом 5xx',
+    LABELS + ('status',),
+)
+STATEMENT_TIMEOUTS = Counter(
+    'api_statement_timeouts_total',
+    'Запросы, отменённые по statement_timeout',
+    ('view', 'action'),
+)
+
+DB_POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use',
+    'Занятые соединения пула',
+    ('alias',),
+    multiprocess_mode='livesum',
+)
+DB_POOL_MAX_SIZE = Gauge(
+    'db_pool_connections_max',
+    'Размер пула соединений',
+    ('alias',),
+    multiprocess_mode='livesum',
+)
+
+
+def get_registry():
+    """
+    Под gunicorn каждый воркер пишет метрики в общий каталог
+    PROMETHEUS_MULTIPROC_DIR, а при выдаче они суммируются.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def observe_request(view, action, method, status, duration, timings):
+    labels = (view, action or '', method)
+    REQUEST_LATENCY.labels(*labels).observe(duration)
+    REQUESTS.labels(*labels, str(status)).inc()
+    DB_QUERIES.labels(*labels).observe(timings.queries)
+    DB_TIME.labels(*labels).observe(timings.db_time)
+    if status >= 500:
+        ERRORS.labels(*labels, str(status)).inc()
+    observe_pools()
+
+
+def observe_pools():
+    """Занятость пулов соединений этого процесса."""
+    for connection in connections.all():
+        stats = getattr(connection, 'pool_stats', lambda: None)()
+        if stats is not None:
+            DB_POOL_IN_USE.labels(connection.alias).set(stats['in_use'])
+            DB_POOL_MAX_SIZE.labels(connection.alias).set(stats['max_size'])
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus."""
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
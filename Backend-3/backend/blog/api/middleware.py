@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import OperationalError
+from django.http import JsonResponse
+
+from api.nplusone import detect_n_plus_one
+from api.timing import get_view_label, query_wrapper, track_queries
+
+logger = logging.getLogger('api.timing')
+
+
+class AsyncCapableMiddleware:
+    """
+    Middleware, которое работает и под WSGI, и под ASGI. В асинхронной
+    цепочке вызов возвращает корутину, и запрос не проходит через
+    общий поток синхронного кода. Подкласс задаёт контекст вокруг
+    обработки запроса (wrap) и обработку ответа (process_response).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        with self.wrap(request) as state:
+            response = self.get_response(request)
+        return self.process_response(request, response, state)
+
+    async def acall(self, request):
+        with self.wrap(request) as state:
+            response = await self.get_response(request)
+        return self.process_response(request, response, state)
+
+    def wrap(self, request):
+        return nullcontext()
+
+    def process_response(self, request, response, state):
+        return response
+
+
+class QueryTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Считает SQL-запросы и время работы БД, сериализации и всего
+    запроса. Результат отдаётся в заголовках Server-Timing и
+    X-DB-Queries, часть запросов пишется в структурированный лог.
+    Включается настройкой QUERY_TIMING_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.sample_rate = settings.QUERY_TIMING_LOG_SAMPLE_RATE
+
+    @contextmanager
+    def wrap(self, request):
+        started = time.perf_counter()
+        with track_queries() as timings:
+            yield timings, started
+
+    def process_response(self, request, response, state):
+        timings, started = state
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = (
+            f'db;dur={timings.db_time * 1000:.1f};'
+            f'desc="{timings.queries} queries", '
+            f'serializer;dur={timings.serializer_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        response['X-DB-Queries'] = str(timings.queries)
+        if self.sample_rate and random.random() < self.sample_rate:
+            self.log(request, response, timings, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_label = get_view_label(view_func, request.method)
+
+    def log(self, request, response, timings, total):
+        view, action = getattr(request, 'view_label', (None, None))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': view,
+            'action': action,
+            'queries': timings.queries,
+            'db_ms': round(timings.db_time * 1000, 2),
+            'serializer_ms': round(timings.serializer_time * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }, ensure_ascii=False))
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Собирает метрики Prometheus по вьюсетам и действиям: задержку,
+    количество запросов, число SQL-запросов и ошибки.
+    Включается настройкой METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        from api.metrics import observe_request
+
+        super().__init__(get_response)
+        self.observe_request = observe_request
+
+    @contextmanager
+    def wrap(self, request):
+        started = time.perf_counter()
+        with track_queries() as timings:
+            yield timings, started
+
+    def process_response(self, request, response, state):
+        timings, started = state
+        view, action = getattr(request, 'view_label', ('unresolved', None))
+        self.observe_request(
+            view, action, request.method, response.status_code,
+            time.perf_counter() - started, timings,
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_label = get_view_label(view_func, request.method)
+
+
+class NPlusOneMiddleware:
+    """
+    Проверяет каждый запрос на N+1. Включается настройкой
+    NPLUSONE_ENABLED; при NPLUSONE_RAISE вместо предупреждения
+    выбрасывается NPlusOneError.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect_n_plus_one(raise_error=settings.NPLUSONE_RAISE):
+            response = self.get_response(request)
+        return response
+
+
+# Код ошибки PostgreSQL query_canceled: сработал statement_timeout.
+QUERY_CANCELED = '57014'
+
+
+class StatementTimeout:
+    """
+    execute_wrapper: перед первым запросом каждого соединения
+    PostgreSQL в рамках HTTP-запроса выставляет statement_timeout, а
+    после смены бюджета — ещё раз. Значение действует до следующего
+    запроса, который выставит своё.
+    """
+
+    def __init__(self, milliseconds):
+        self.milliseconds = milliseconds
+        self.applied = set()
+
+    def set_budget(self, milliseconds):
+        if milliseconds != self.milliseconds:
+            self.milliseconds = milliseconds
+            self.applied.clear()
+
+    def __call__(self, execute, sql, params, many, context):
+        connection = context['connection']
+        # У каждого потока своё соединение с тем же алиасом.
+        if (
+            connection.vendor == 'postgresql'
+            and connection not in self.applied
+        ):
+            self.applied.add(connection)
+            context['cursor'].execute(
+                'SET statement_timeout = %s', [self.milliseconds]
+            )
+        return execute(sql, params, many, context)
+
+
+class StatementTimeoutMiddleware(AsyncCapableMiddleware):
+    """
+    Ограничивает время SQL-запросов по типу эндпоинта (настройка
+    STATEMENT_TIMEOUTS): короче для анонимных списков, длиннее для
+    выгрузки списка покупок и админки. Отменённый по таймауту запрос
+    превращается в ответ 503 с Retry-After. Включается настройкой
+    STATEMENT_TIMEOUT_ENABLED, работает только с PostgreSQL.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATEMENT_TIMEOUT_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def wrap(self, request):
+        request.statement_timeout = StatementTimeout(
+            settings.STATEMENT_TIMEOUTS['default']
+        )
+        return query_wrapper(request.statement_timeout)
+
+    def get_budget(self, request, action):
+        timeouts = settings.STATEMENT_TIMEOUTS
+        if request.path.startswith('/admin/'):
+            return timeouts['admin']
+        if action in timeouts:
+            return timeouts[action]
+        if (
+            action == 'list'
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and not request.user.is_authenticated
+        ):
+            return timeouts['anonymous_list']
+        return timeouts['default']
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_label = get_view_label(view_func, request.method)
+        request.statement_timeout.set_budget(
+            self.get_budget(request, request.view_label[1])
+        )
+
+    def process_exception(self, request, exception):
+        if not (
+            isinstance(exception, OperationalError)
+            and getattr(exception.__cause__, 'pgcode', None) == QUERY_CANCELED
+        ):
+            return None
+        view, action = getattr(request, 'view_label', ('unresolved', None))
+        logger.warning(
+            'Запрос %s %s отменён по statement_timeout',
+            request.method, request.path,
+        )
+        if settings.METRICS_ENABLED:
+            from api.metrics import STATEMENT_TIMEOUTS
+
+            STATEMENT_TIMEOUTS.labels(view, action or '').inc()
+        response = JsonResponse(
+            {'detail': 'Запрос выполнялся слишком долго, повторите позже.'},
+            status=503,
+            json_dumps_params={'ensure_ascii': False},
+        )
+        response['Retry-After'] = str(settings.STATEMENT_TIMEOUT_RETRY_AFTER)
+        return response
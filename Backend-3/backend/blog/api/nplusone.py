@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+import sys
+import time
+import warnings
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import Serializer
+
+logger = logging.getLogger('api.nplusone')
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+NUMBERS = re.compile(r'\b\d+\b')
+SPACES = re.compile(r'\s+')
+# Служебные модули, которые не считаются местом вызова запроса.
+INTERNAL_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('middleware.py', 'nplusone.py', 'timing.py')
+}
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    """Приводит SQL к виду, не зависящему от параметров запроса."""
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = NUMBERS.sub('N', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def find_origin():
+    """
+    Ищет по стеку место в коде проекта, откуда пришёл запрос, и поле
+    сериализатора, при выводе которого он был выполнен.
+    """
+    call_site = serializer_field = None
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None and not (call_site and serializer_field):
+        code = frame.f_code
+        if (call_site is None
+                and code.co_filename.startswith(base_dir)
+                and 'site-packages' not in code.co_filename
+                and code.co_filename not in INTERNAL_FILES):
+            call_site = f'{code.co_filename}:{frame.f_lineno} ({code.co_name})'
+        if serializer_field is None and code.co_name == 'to_representation':
+            owner = frame.f_locals.get('self')
+            field = frame.f_locals.get('field')
+            if isinstance(owner, Serializer) and field is not None:
+                serializer_field = (
+                    f'{type(owner).__name__}.{field.field_name}'
+                )
+        frame = frame.f_back
+    return call_site, serializer_field
+
+
+class NPlusOneDetector:
+    """
+    Группирует SQL-запросы по нормализованному тексту и месту вызова.
+    Повторение одного отпечатка больше threshold раз за запрос
+    считается признаком N+1.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = defaultdict(int)
+        self.slowest = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            call_site, field = find_origin()
+            fingerprint = (normalize_sql(sql), call_site, field)
+            self.counts[fingerprint] += 1
+            slowest = self.slowest.get(fingerprint)
+            if slowest is None or duration > slowest[0]:
+                self.slowest[fingerprint] = (
+                    duration, sql, params, context['connection'].alias
+                )
+
+    def problems(self):
+        return [
+            fingerprint for fingerprint, count in self.counts.items()
+            if count > self.threshold
+        ]
+
+    def explain(self, fingerprint):
+        _, sql, params, alias = self.slowest[fingerprint]
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.explain_query_prefix()} {sql}', params
+                )
+                return '\n'.join(
+                    ' '.join(str(column) for column in row)
+                    for row in cursor.fetchall()
+                )
+        except Exception as error:
+            return f'EXPLAIN недоступен: {error}'
+
+    def report(self):
+        lines = []
+        for fingerprint in self.problems():
+            sql, call_site, field = fingerprint
+            duration = self.slowest[fingerprint][0]
+            lines.append(
+                f'N+1: {self.counts[fingerprint]} одинаковых запросов\n'
+                f'  поле сериализатора: {field or "-"}\n'
+                f'  место вызова: {call_site or "-"}\n'
+                f'  SQL: {sql}\n'
+                f'  самый медленный: {duration * 1000:.2f} мс, план:\n'
+                f'{self.explain(fingerprint)}'
+            )
+        return '\n\n'.join(lines)
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, raise_error=True):
+    """
+    Контекстный менеджер для тестов и отладки:
+
+        with detect_n_plus_one(threshold=3):
+            client.get('/api/recipes/')
+    """
+    detector = NPlusOneDetector(
+        settings.NPLUSONE_THRESHOLD if threshold is None else threshold
+    )
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+    if detector.problems():
+        report = detector.report()
+        if raise_error:
+            raise NPlusOneError(report)
+        warnings.warn(report, NPlusOneWarning)
+        logger.warning(report)
@@ -1,6 +1,108 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 
+from api.recipe_json import RawJSON, RawJSONRenderer
+
+CHANGES_PAGE_SIZE = 100
+KEYSET_MAX_PAGE_SIZE = 500
+FEED_PAGE_SIZE = 20
+
 
 class PageLimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+def list_state(queryset):
+    """Количество рецептов и последний updated_at среди них."""
+    return queryset.order_by().aggregate(
+        count=Count('pk'), last_modified=Max('updated_at')
+    )
+
+
+class RecipePaginator(Paginator):
+    """
+    Вместо COUNT считает list_state тем же запросом: из него строится
+    ETag списка без отдельного агрегата.
+    """
+
+    @cached_property
+    def state(self):
+        if isinstance(self.object_list, QuerySet):
+            return list_state(self.object_list)
+        return {'count': len(self.object_list), 'last_modified': None}
+
+    @cached_property
+    def count(self):
+        return self.state['count']
+
+
+class RecipePagination(PageLimitPagination):
+    django_paginator_class = RecipePaginator
+
+    def get_paginated_response(self, data):
+        """Готовый JSON страницы вставляется в обёртку без разбора."""
+        if not isinstance(data, RawJSON):
+            return super().get_paginated_response(data)
+        response = super().get_paginated_response([])
+        envelope = RawJSONRenderer().render(response.data).decode()
+        response.data = RawJSON(envelope[:-len('[]}')] + data + '}')
+        return response
+
+
+def get_keyset_limit(request, default):
+    """Размер страницы из параметра limit, не больше KEYSET_MAX_PAGE_SIZE."""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        return default
+    return min(max(limit, 1), KEYSET_MAX_PAGE_SIZE)
+
+
+def encode_cursor(timestamp, kind, pk):
+    """Непрозрачный курсор на позицию (время, тип записи, id)."""
+    raw = json.dumps([timestamp.isoformat(), kind, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, param='since'):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, kind, pk = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(kind), int(pk)
+    except (TypeError, ValueError):
+        raise ValidationError({param: 'Некорректный курсор.'})
+
+
+def keyset_after(cursor, kind, time_field, pk_field='pk'):
+    """
+    Условие «строго после курсора» для потока записей типа kind,
+    упорядоченного по (time_field, kind, pk_field).
+    """
+    if cursor is None:
+        return Q()
+    timestamp, cursor_kind, pk = cursor
+    after = Q(**{f'{time_field}__gt': timestamp})
+    if kind > cursor_kind:
+        return after | Q(**{time_field: timestamp})
+    if kind == cursor_kind:
+        return after | Q(**{time_field: timestamp, f'{pk_field}__gt': pk})
+    return after
+
+
+def keyset_before(cursor, time_field, pk_field='pk'):
+    """Условие «строго раньше курсора» для порядка от новых к старым."""
+    if cursor is None:
+        return Q()
+    timestamp, _, pk = cursor
+    return Q(**{f'{time_field}__lt': timestamp}) | Q(
+        **{time_field: timestamp, f'{pk_field}__lt': pk}
+    )
@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.db import connections, router
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+# Документ склеивается строкой, а не json_build_object: PostgreSQL
+# печатает json с пробелами вокруг «:» и после «,», а JSONRenderer —
+# компактно. Строки экранирует to_json.
+RECIPE_JSON_SQL = """
+SELECT '{{"tags":[' || COALESCE((
+        SELECT string_agg(
+            '{{"id":' || t.id
+            || ',"name":' || to_json(t.name)
+            || ',"color":' || to_json(t.color)
+            || ',"slug":' || to_json(t.slug) || '}}',
+            ',' ORDER BY t.id
+        )
+        FROM {tag} t JOIN {recipe_tag} rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = r.id
+    ), '')
+    || '],"author":{{"email":' || to_json(u.email)
+    || ',"id":' || u.id
+    || ',"username":' || to_json(u.username)
+    || ',"first_name":' || to_json(u.first_name)
+    || ',"last_name":' || to_json(u.last_name)
+    || ',"is_subscribed":' || to_json(EXISTS(
+        SELECT 1 FROM {subscription} s
+        WHERE s.user_id = %(user)s AND s.author_id = u.id
+    ))
+    || '}},"name":' || to_json(r.name)
+    || ',"image":' || COALESCE(to_json(p.image), 'null')
+    || ',"text":' || to_json(r.text)
+    || ',"id":' || r.id
+    || ',"ingredients":[' || COALESCE((
+        SELECT string_agg(
+            '{{"id":' || ri.ingredient_id
+            || ',"name":' || to_json(i.name)
+            || ',"amount":' || ri.amount
+            || ',"measurement_unit":' || to_json(i.measurement_unit) || '}}',
+            ',' ORDER BY ri.id
+        )
+        FROM {recipe_ingredient} ri JOIN {ingredient} i
+            ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id
+    ), '')
+    || '],"cooking_time":' || r.cooking_time
+    || ',"is_favorited":' || to_json(EXISTS(
+        SELECT 1 FROM {favorite} f
+        WHERE f.user_id = %(user)s AND f.recipe_id = r.id
+    ))
+    || ',"is_in_shopping_cart":' || to_json(EXISTS(
+        SELECT 1 FROM {cart} c
+        WHERE c.user_id = %(user)s AND c.recipe_id = r.id
+    ))
+    || '}}'
+FROM unnest(%(ids)s::bigint[], %(images)s::text[])
+    WITH ORDINALITY AS p(id, image, position)
+JOIN {recipe} r ON r.id = p.id
+JOIN {user} u ON u.id = r.author_id
+ORDER BY p.position
+""".format(
+    recipe=Recipe._meta.db_table,
+    recipe_tag=Recipe.tags.through._meta.db_table,
+    tag=Tag._meta.db_table,
+    recipe_ingredient=RecipeIngredient._meta.db_table,
+    ingredient=Ingredient._meta.db_table,
+    user=User._meta.db_table,
+    subscription=Subscription._meta.db_table,
+    favorite=Favorite._meta.db_table,
+    cart=ShoppingCart._meta.db_table,
+)
+
+
+class RawJSON(str):
+    """Уже отрендеренный JSON: RawJSONRenderer отдаёт его как есть."""
+
+
+class RawJSONRenderer(JSONRenderer):
+    """JSONRenderer, который не перекодирует готовые документы RawJSON."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, RawJSON):
+            return data.encode()
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+def read_connection():
+    return connections[router.db_for_read(Recipe)]
+
+
+def fast_path_enabled():
+    return (
+        settings.RECIPE_JSON_FAST_PATH
+        and read_connection().vendor == 'postgresql'
+    )
+
+
+def image_url(recipe, request):
+    """URL картинки, как его выводит ImageField сериализатора."""
+    if not recipe.image:
+        return None
+    url = recipe.image.url
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def render_documents(recipes, request=None):
+    """
+    Документы рецептов в порядке recipes одним запросом к той же БД,
+    с которой читаются рецепты. Персональные флаги считаются для
+    пользователя request, URL картинок — по загруженным рецептам.
+    Байты совпадают с JSONRenderer поверх RecipesReadSerializer.
+    """
+    user = getattr(request, 'user', None)
+    with read_connection().cursor() as cursor:
+        cursor.execute(RECIPE_JSON_SQL, {
+            'ids': [recipe.id for recipe in recipes],
+            'images': [image_url(recipe, request) for recipe in recipes],
+            'user': user.pk if user is not None else None,
+        })
+        documents = [document for document, in cursor.fetchall()]
+    # JSONRenderer экранирует разделители строк, to_json — нет.
+    return [
+        document.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        for document in documents
+    ]
+
+
+class RecipeDocuments:
+    """Замена сериализатора в list и retrieve при быстром пути."""
+
+    def __init__(self, instance, many, request):
+        self.instance = instance
+        self.many = many
+        self.request = request
+
+    @property
+    def data(self):
+        recipes = list(self.instance) if self.many else [self.instance]
+        documents = render_documents(recipes, self.request)
+        if self.many:
+            return RawJSON('[' + ','.join(documents) + ']')
+        return RawJSON(documents[0])
+
+
+class RecipeJSONMixin:
+    """
+    При RECIPE_JSON_FAST_PATH список и карточка рецептов отдаются
+    документами, собранными в PostgreSQL: их текст идёт в тело ответа
+    без полей DRF и повторного рендеринга. ETag, кэш анонимных ответов
+    и пагинация работают как обычно.
+    """
+
+    fast_path_actions = ('list', 'retrieve')
+
+    def get_serializer(self, *args, **kwargs):
+        if (
+            args and self.action in self.fast_path_actions
+            and fast_path_enabled()
+        ):
+            return RecipeDocuments(
+                args[0], kwargs.get('many', False), self.request
+            )
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,168 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.cache import LAST_WRITE_KEY
+
+logger = logging.getLogger('api.replicas')
+
+PRIMARY_UNTIL_KEY = 'db:primary_until:{}'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# Задержка реплик в памяти процесса: алиас -> (проверено, задержка).
+_lag = {}
+
+
+def replica_lag(alias):
+    """
+    Отставание реплики в секундах, проверяется не чаще
+    REPLICA_LAG_CHECK_INTERVAL. Реплика, применившая всё полученное,
+    не отстаёт: время последней применённой транзакции растёт и при
+    простое основной БД. Недоступная реплика считается бесконечно
+    отстающей.
+    """
+    now = time.monotonic()
+    checked = _lag.get(alias)
+    if checked is not None and now - checked[0] < (
+        settings.REPLICA_LAG_CHECK_INTERVAL
+    ):
+        return checked[1]
+    lag = 0.0
+    connection = connections[alias]
+    try:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT CASE WHEN pg_last_wal_receive_lsn() '
+                    '= pg_last_wal_replay_lsn() THEN 0 '
+                    'ELSE EXTRACT(EPOCH FROM now() '
+                    '- pg_last_xact_replay_timestamp()) END'
+                )
+                lag = float(cursor.fetchone()[0] or 0)
+        else:
+            connection.ensure_connection()
+    except DatabaseError:
+        logger.warning('Реплика %s недоступна', alias, exc_info=True)
+        lag = float('inf')
+    _lag[alias] = (now, lag)
+    return lag
+
+
+def choose_replica():
+    """Случайная реплика с допустимым отставанием или основная БД."""
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_lag(alias) <= settings.REPLICA_MAX_LAG
+    ]
+    return random.choice(replicas) if replicas else 'default'
+
+
+def mark_primary(user_id):
+    """После записи пользователь какое-то время читает с основной БД."""
+    cache.set(
+        PRIMARY_UNTIL_KEY.format(user_id),
+        time.time() + settings.REPLICA_STICKY_SECONDS,
+        settings.REPLICA_STICKY_SECONDS,
+    )
+
+
+def must_read_primary(user):
+    """
+    Чтение идёт с основной БД, пока реплика могла не получить
+    последнюю запись: в течение REPLICA_MAX_LAG после любой записи,
+    меняющей кэшируемые данные (иначе в общий кэш попал бы устаревший
+    ответ под новой версией), и REPLICA_STICKY_SECONDS после записи
+    самого пользователя.
+    """
+    keys = [LAST_WRITE_KEY]
+    if user.is_authenticated:
+        keys.append(PRIMARY_UNTIL_KEY.format(user.pk))
+    values = cache.get_many(keys)
+    now = time.time()
+    last_write = values.get(LAST_WRITE_KEY)
+    if last_write is not None and now - last_write < (
+        settings.REPLICA_MAX_LAG
+    ):
+        return True
+    until = values.get(keys[-1]) if user.is_authenticated else None
+    return until is not None and until > now
+
+
+class ReplicaRouter:
+    """
+    Чтения внутри запросов, отмеченных ReplicaReadMixin, уходят на
+    реплику, всё остальное и все записи — на основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _replica_reads.get()
+        return alias or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaReadMixin:
+    """
+    Безопасные запросы вьюсета читают с реплики. При
+    replica_anonymous_only реплика используется только для анонимов:
+    ответ пользователю зависит от его свежих записей. Действия из
+    primary_actions всегда читают с основной БД.
+    """
+
+    replica_anonymous_only = False
+    primary_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.can_read_replica(request):
+            self.replica_token = _replica_reads.set(choose_replica())
+
+    def can_read_replica(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return False
+        if request.method not in SAFE_METHODS:
+            return False
+        if self.action in self.primary_actions:
+            return False
+        if self.replica_anonymous_only and request.user.is_authenticated:
+            return False
+        return not must_read_primary(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self.replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """Запоминает пользователей, которые только что записывали данные."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None and user.is_authenticated
+        ):
+            mark_primary(user.pk)
+        return response
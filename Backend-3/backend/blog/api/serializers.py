@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.db import models, transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
@@ -15,10 +17,17 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.signals import touch_recipes
 from users.models import User, Subscription
+from api.fragments import (
+    get_recipe_cards,
+    invalidate_fragments,
+    update_projection,
+)
+from api.timing import TimedSerializerMixin
 
 
-class TagSerialiser(serializers.ModelSerializer):
+class TagSerialiser(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для работы с тегами."""
 
     class Meta:
@@ -26,7 +35,8 @@ class TagSerialiser(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для работы с ингредиентами."""
 
     class Meta:
@@ -88,7 +98,7 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         return obj.ingredient.measurement_unit
 
 
-class UserGetSerializer(UserSerializer):
+class UserGetSerializer(TimedSerializerMixin, UserSerializer):
     """Сериализатор для работы с информацией о пользователях."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -108,6 +118,17 @@ class UserGetSerializer(UserSerializer):
         return False
 
 
+class CookableSerializer(serializers.Serializer):
+    """Ингредиенты, которые есть у пользователя."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, default=settings.COOKABLE_MAX_MISSING
+    )
+
+
 class SetPasswordSerializer(serializers.Serializer):
     """Сериализатор для изменение пароля пользователя."""
 
@@ -154,7 +175,8 @@ class UserCreateSerializer(UserCreateSerializer):
                   'first_name', 'last_name', 'password')
 
 
-class RecipesReadSerializer(serializers.ModelSerializer):
+class RecipesReadSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """Сериализатор для отображения информации о рецептах"""
 
     tags = TagSerialiser(many=True)
@@ -190,18 +212,31 @@ class RecipesReadSerializer(serializers.ModelSerializer):
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
-        if request.user.is_anonymous:
+        if request is None or request.user.is_anonymous:
             return False
         return Favorite.objects.filter(recipe=obj, user=request.user).exists()
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
-        if request.user.is_anonymous:
+        if request is None or request.user.is_anonymous:
             return False
         return ShoppingCart.objects.filter(recipe=obj,
                                            user=request.user).exists()
 
 
+class RecipeCardListSerializer(TimedSerializerMixin,
+                               serializers.ListSerializer):
+    """
+    Список рецептов из кэшированных карточек: один get_many
+    к кэшу и один запрос персональных флагов на страницу.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        return get_recipe_cards(data, self.context)
+
+
 class RecipesWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для создания рецептов"""
 
@@ -213,10 +248,10 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'name', 'image', 'text',
                   'ingredients', 'cooking_time')
+        list_serializer_class = RecipeCardListSerializer
 
     def to_representation(self, instance):
-        serializer = RecipesReadSerializer(instance, context=self.context)
-        return serializer.data
+        return get_recipe_cards([instance], self.context)[0]
 
     @staticmethod
     def __add_ingredients__(recipe, ingredients):
@@ -229,6 +264,11 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
                 amount=ingr.get('amount')
             ) for ingr in ingredients
         ])
+        # bulk_create не шлёт сигналов RecipeIngredient: рецепт сдвигается
+        # и карточка пересобирается уже с записанными ингредиентами.
+        touch_recipes(Recipe.objects.filter(pk=recipe.pk))
+        invalidate_fragments([recipe.pk])
+        update_projection([recipe.pk])
 
     def validate_ingredients(self, data):
         ingredients_list = []
@@ -247,6 +287,7 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
             raise ValidationError('Время приготовления должно быть больше 0')
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = self.initial_data.get('tags')
@@ -261,6 +302,7 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
         self.__add_ingredients__(new_recipe, ingredients)
         return new_recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         if 'ingredients' in validated_data:
             ingredients = validated_data.pop('ingredients')
@@ -271,7 +313,8 @@ class RecipesWriteSerializer(serializers.ModelSerializer):
         return super().update(recipe, validated_data)
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для предоставления информации о рецептах."""
 
     class Meta:
@@ -1,4 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.http import HttpResponse
+from django.utils import timezone
+
+from api.pagination import keyset_after, keyset_before
+from recipes.models import Recipe, RecipeDeletion, TimelineEntry
+from recipes.timeline import get_celebrity_ids
+
+RECIPE_CHANGE = 0
+RECIPE_DELETION = 1
 
 
 def convert_to_file(cart_ingredients):
@@ -19,3 +30,60 @@ def convert_to_file(cart_ingredients):
     )
 
     return response
+
+
+def get_recipe_changes(cursor, limit):
+    """
+    Изменённые рецепты и удаления после курсора в общем порядке
+    (время, тип записи, id). Самые свежие записи придерживаются на
+    RECIPE_CHANGES_LAG секунд: транзакция, начатая раньше, может
+    зафиксироваться позже и иначе оказалась бы позади курсора.
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.RECIPE_CHANGES_LAG)
+    recipes = Recipe.objects.filter(
+        keyset_after(cursor, RECIPE_CHANGE, 'updated_at'),
+        updated_at__lte=horizon,
+    ).order_by('updated_at', 'pk')[:limit + 1]
+    deletions = RecipeDeletion.objects.filter(
+        keyset_after(cursor, RECIPE_DELETION, 'deleted_at'),
+        deleted_at__lte=horizon,
+    ).order_by('deleted_at', 'pk')[:limit + 1]
+    stream = sorted(
+        [(recipe.updated_at, RECIPE_CHANGE, recipe.pk, recipe)
+         for recipe in recipes]
+        + [(deletion.deleted_at, RECIPE_DELETION, deletion.pk, deletion)
+           for deletion in deletions],
+        key=lambda item: item[:3],
+    )
+    return stream[:limit], len(stream) > limit
+
+
+def get_feed(user, cursor, limit):
+    """
+    Лента рецептов авторов, на которых подписан пользователь, от новых
+    к старым. Обычные авторы читаются из TimelineEntry, рецепты
+    авторов-знаменитостей подмешиваются при чтении.
+    """
+    entries = TimelineEntry.objects.filter(
+        keyset_before(cursor, 'pub_date', 'recipe_id'), user=user,
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit + 1]
+    stream = set(entries)
+    celebrities = get_celebrity_ids()
+    if celebrities:
+        followed = celebrities.intersection(
+            user.follower.values_list('author_id', flat=True)
+        )
+        stream.update(Recipe.objects.filter(
+            keyset_before(cursor, 'pub_date'), author_id__in=followed,
+        ).order_by('-pub_date', '-pk').values_list(
+            'pub_date', 'pk'
+        )[:limit + 1])
+    stream = sorted(stream, reverse=True)
+    page = stream[:limit]
+    recipes = Recipe.objects.in_bulk([recipe_id for _, recipe_id in page])
+    return (
+        [recipes[recipe_id] for _, recipe_id in page if recipe_id in recipes],
+        page[-1] if len(stream) > limit else None,
+    )
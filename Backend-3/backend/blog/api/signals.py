@@ -0,0 +1,157 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db import connections
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from api.authentication import revoke_user_tokens
+from api.cache import bump_version
+from api.fragments import (
+    invalidate_all_fragments,
+    invalidate_fragments,
+    update_projection,
+)
+from api.snapshots import bump_data_version
+from api.timing import install_dispatch
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import changes_author_card
+from users.models import User
+
+SNAPSHOT_SCOPES = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+CACHE_SCOPES = {
+    Recipe: ('recipes',),
+    RecipeIngredient: ('recipes',),
+    Tag: ('tags',),
+    Ingredient: ('ingredients',),
+    User: ('users',),
+}
+
+
+def is_login_update(sender, update_fields):
+    """Вход пользователя обновляет только last_login, кэш он не меняет."""
+    return sender is User and set(update_fields or ()) == {'last_login'}
+
+
+def invalidate_api_cache(sender, **kwargs):
+    scopes = CACHE_SCOPES.get(sender)
+    if scopes is None or is_login_update(sender, kwargs.get('update_fields')):
+        return
+    bump_version(*scopes)
+
+
+def card_recipe_ids(sender, instance):
+    """id рецептов, в карточках которых выводится instance."""
+    if sender is Tag:
+        recipes = Recipe.objects.filter(tags=instance)
+    elif sender is Ingredient:
+        recipes = Recipe.objects.filter(recipeingredients__ingredient=instance)
+    else:
+        recipes = instance.recipes.all()
+    return recipes.values_list('pk', flat=True)
+
+
+def invalidate_recipe_cards(sender, instance, **kwargs):
+    if sender is Recipe:
+        invalidate_fragments([instance.pk])
+        update_projection([instance.pk])
+    elif sender is RecipeIngredient:
+        invalidate_fragments([instance.recipe_id])
+        update_projection([instance.recipe_id])
+    elif sender in (Tag, Ingredient):
+        invalidate_all_fragments()
+        # Связи удалённого тега к post_delete уже стёрты (см.
+        # rebuild_deleted_tag_cards), строки ингредиента удаляются
+        # со своими сигналами.
+        if kwargs.get('signal') is post_save:
+            update_projection(card_recipe_ids(sender, instance))
+    elif sender is User and changes_author_card(
+        kwargs.get('created'), kwargs.get('update_fields')
+    ):
+        recipe_ids = list(card_recipe_ids(sender, instance))
+        invalidate_fragments(recipe_ids)
+        update_projection(recipe_ids)
+
+
+def bump_snapshot_version(sender, **kwargs):
+    bump_data_version(SNAPSHOT_SCOPES[sender])
+
+
+for model in SNAPSHOT_SCOPES:
+    for signal in (post_save, post_delete):
+        signal.connect(bump_snapshot_version, sender=model)
+
+
+# Обработчики подключаются только к своим моделям: у остальных
+# (избранное, список покупок) удаление остаётся быстрым DELETE по
+# условию фильтра, с user_id, без выборки id.
+for model in CACHE_SCOPES:
+    for signal in (post_save, post_delete):
+        signal.connect(invalidate_api_cache, sender=model)
+        signal.connect(invalidate_recipe_cards, sender=model)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    if not action.startswith('post_'):
+        return
+    bump_version('recipes')
+    if not reverse:
+        invalidate_fragments([instance.pk])
+        update_projection([instance.pk])
+    elif pk_set:
+        invalidate_fragments(pk_set)
+        update_projection(pk_set)
+    else:
+        invalidate_all_fragments()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def rebuild_cleared_tag_cards(sender, instance, action, reverse, **kwargs):
+    """tag.recipes.clear(): после очистки рецептов тега уже не найти."""
+    if action == 'pre_clear' and reverse:
+        update_projection(card_recipe_ids(Tag, instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def rebuild_deleted_tag_cards(sender, instance, **kwargs):
+    update_projection(card_recipe_ids(Tag, instance))
+
+
+@receiver(post_save, sender=User)
+def revoke_deactivated_user_tokens(sender, instance, created, **kwargs):
+    if not created and not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(request_started)
+def close_unusable_connections(**kwargs):
+    """
+    Проверка постоянных соединений перед запросом: соединение, которое
+    сервер БД успел закрыть, закрывается и открывается заново, а не
+    роняет первый запрос ошибкой.
+    """
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+@receiver(connection_created)
+def dispatch_connection_queries(sender, connection, **kwargs):
+    install_dispatch(connection)
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import re
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import DataVersion
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SNAPSHOT_KEY = 'api:snapshot:{}:{}'
+ETAG_SEPARATOR = re.compile(r'\s*,\s*')
+
+Snapshot = namedtuple('Snapshot', ('etag', 'body', 'gzip', 'brotli'))
+
+# Последний снимок каждой области в памяти процесса: (версия, снимок).
+_local = {}
+
+
+def get_data_version(scope):
+    return DataVersion.objects.filter(scope=scope).values_list(
+        'version', flat=True
+    ).first() or 0
+
+
+def bump_data_version(scope):
+    """
+    Сдвигает версию справочника в той же транзакции, что и запись:
+    новая версия видна всем процессам вместе с новыми данными.
+    """
+    if not DataVersion.objects.filter(scope=scope).update(
+        version=F('version') + 1
+    ):
+        DataVersion.objects.get_or_create(scope=scope, defaults={'version': 1})
+
+
+def build_snapshot(serializer_class, queryset):
+    """
+    Один раз сериализует набор данных в те же байты, что отдал бы
+    JSONRenderer, и заранее сжимает их.
+    """
+    body = JSONRenderer().render(serializer_class(queryset, many=True).data)
+    return Snapshot(
+        etag=f'"{hashlib.sha256(body).hexdigest()}"',
+        body=body,
+        gzip=gzip.compress(body, compresslevel=9, mtime=0),
+        brotli=brotli.compress(body) if brotli else None,
+    )
+
+
+def get_snapshot(scope, serializer_class, queryset):
+    """
+    Снимок для текущей версии области scope. Версия читается из БД
+    одним запросом по первичному ключу, поэтому запись в любом
+    процессе, в том числе в load_ingredients, видна всем воркерам и
+    при кэше отдельного процесса. Снимок строит один процесс,
+    остальные берут его из кэша.
+    """
+    version = get_data_version(scope)
+    local = _local.get(scope)
+    if local is not None and local[0] == version:
+        return local[1]
+    key = SNAPSHOT_KEY.format(scope, version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(serializer_class, queryset)
+        cache.set(key, snapshot, timeout=None)
+    _local[scope] = (version, snapshot)
+    return snapshot
+
+
+def accepts_encoding(request, encoding):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return any(
+        part.split(';')[0].strip() == encoding
+        for part in header.split(',')
+    )
+
+
+def snapshot_response(request, snapshot):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if snapshot.etag in ETAG_SEPARATOR.split(if_none_match.strip()):
+        response = HttpResponseNotModified()
+    elif snapshot.brotli is not None and accepts_encoding(request, 'br'):
+        response = HttpResponse(snapshot.brotli, 'application/json')
+        response['Content-Encoding'] = 'br'
+    elif accepts_encoding(request, 'gzip'):
+        response = HttpResponse(snapshot.gzip, 'application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(snapshot.body, 'application/json')
+    response['ETag'] = snapshot.etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+class SnapshotListMixin:
+    """
+    Отдаёт нефильтрованный список из готового снимка с ETag и
+    ответом 304 при совпадении. Запросы с параметрами и в формате,
+    отличном от JSON, обрабатываются обычным list.
+    """
+
+    snapshot_scope = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or not isinstance(
+            request.accepted_renderer, JSONRenderer
+        ):
+            return super().list(request, *args, **kwargs)
+        snapshot = get_snapshot(
+            self.snapshot_scope,
+            self.get_serializer_class(),
+            self.get_queryset(),
+        )
+        return snapshot_response(request, snapshot)
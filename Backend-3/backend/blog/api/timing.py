@@ -0,0 +1,124 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+_current = ContextVar('request_timings', default=None)
+_query_wrappers = ContextVar('query_wrappers', default=())
+
+
+def dispatch_query(execute, sql, params, many, context):
+    """
+    Постоянный execute_wrapper каждого соединения: передаёт запрос
+    обёрткам из query_wrapper() текущего контекста. Соединения Django
+    свои у каждого потока, а контекст переходит в потоки sync_to_async,
+    поэтому под ASGI учитываются и синхронные вьюхи, которые работают
+    в общем потоке синхронного кода, а не в потоке middleware.
+    """
+    for wrapper in _query_wrappers.get():
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatch(connection):
+    """Подключает dispatch_query к соединению один раз."""
+    if dispatch_query not in connection.execute_wrappers:
+        # В начало списка: connection.execute_wrapper() снимает
+        # последнюю обёртку.
+        connection.execute_wrappers.insert(0, dispatch_query)
+
+
+@contextmanager
+def query_wrapper(wrapper):
+    """
+    execute_wrapper для всех SQL-запросов текущего HTTP-запроса, в
+    каком бы потоке и соединении они ни выполнялись.
+    """
+    token = _query_wrappers.set(_query_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _query_wrappers.reset(token)
+
+
+class RequestTimings:
+    """
+    Замеры одного запроса: количество и время SQL-запросов,
+    время сериализации. Экземпляр подключается к запросам через
+    query_wrapper.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+
+def get_current_timings():
+    return _current.get()
+
+
+@contextmanager
+def track_queries():
+    """
+    Подключает замеры к SQL-запросам на время запроса. Если замеры
+    уже ведутся выше по стеку middleware, используются они.
+    """
+    timings = get_current_timings()
+    if timings is not None:
+        yield timings
+        return
+    timings = RequestTimings()
+    token = timings.activate()
+    try:
+        with query_wrapper(timings):
+            yield timings
+    finally:
+        RequestTimings.deactivate(token)
+
+
+def get_view_label(view_func, method):
+    """
+    Возвращает пару (имя вьюсета, действие) для view-функции,
+    созданной роутером DRF, например ('RecipesViewSet', 'list').
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', 'unknown'), None
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, actions.get(method.lower())
+
+
+class TimedSerializerMixin:
+    """
+    Учитывает время to_representation в замерах текущего запроса.
+    Вложенные сериализаторы не суммируются повторно.
+    """
+
+    def to_representation(self, instance):
+        timings = get_current_timings()
+        if timings is None or timings._serializer_depth:
+            return super().to_representation(instance)
+        timings._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.serializer_time += time.perf_counter() - started
+            timings._serializer_depth -= 1
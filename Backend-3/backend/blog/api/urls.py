@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
     IngredientViewSet,
     RecipesViewSet,
+    SignedTokenViewSet,
     TagViewSet,
     UserSubscriptionsViewSet
 )
@@ -14,9 +16,17 @@ router.register('tags', TagViewSet, basename='tags')
 router.register('ingredients', IngredientViewSet, basename='ingredients')
 router.register('recipes', RecipesViewSet, basename='recipes')
 router.register('users', UserSubscriptionsViewSet, basename='users')
+if settings.JWT_AUTH_ENABLED:
+    router.register('auth/jwt', SignedTokenViewSet, basename='jwt')
+
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    from api.async_views import async_read_urls
+
+    router_urls = async_read_urls(router_urls)
 
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
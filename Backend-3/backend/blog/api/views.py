@@ -1,13 +1,30 @@
 from django.shortcuts import get_object_or_404
 from django.db.models import Sum
+from djoser.conf import settings as djoser_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status, mixins, viewsets
 
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.authentication import (
+    check_not_revoked,
+    deny_token,
+    issue_tokens,
+    revoke_user_tokens,
+)
+from api.cache import AnonymousCacheMixin
+from api.conditional import ConditionalRecipeMixin
 from api.filters import IngredientFilter, RecipeFilter
+from api.recipe_json import RawJSONRenderer, RecipeJSONMixin
+from api.replicas import ReplicaReadMixin
+from api.snapshots import SnapshotListMixin
 from api.serializers import (
+    CookableSerializer,
     FavoriteSerializer,
     IngredientSerializer,
     RecipesWriteSerializer,
@@ -28,23 +45,52 @@ from recipes.models import (
 )
 from api.permissions import IsAdminAuthorOrReadOnly
 from api.utils import create_model_instance, delete_model_instance
+from recipes.pantry import ingredient_index
+from recipes.popularity import order_by_popularity
 from users.models import Subscription, User
-from api.services import convert_to_file
-from api.pagination import PageLimitPagination
+from api.services import (
+    RECIPE_CHANGE,
+    convert_to_file,
+    get_feed,
+    get_recipe_changes,
+)
+from api.pagination import (
+    CHANGES_PAGE_SIZE,
+    FEED_PAGE_SIZE,
+    PageLimitPagination,
+    RecipePagination,
+    decode_cursor,
+    encode_cursor,
+    get_keyset_limit,
+)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin,
+    SnapshotListMixin,
+    AnonymousCacheMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Получение информации теги"""
 
+    cache_scopes = ('tags',)
+    snapshot_scope = 'tags'
+    async_read_actions = ('list', 'retrieve')
     queryset = Tag.objects.all()
     serializer_class = TagSerialiser
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ReplicaReadMixin,
+    SnapshotListMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     """Получение информации ингридиенты."""
 
+    snapshot_scope = 'ingredients'
+    async_read_actions = ('list', 'retrieve')
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminAuthorOrReadOnly,)
@@ -53,15 +99,27 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(
+    ReplicaReadMixin,
+    AnonymousCacheMixin,
+    ConditionalRecipeMixin,
+    RecipeJSONMixin,
+    viewsets.ModelViewSet,
+):
     """Использование рецепто. Создание/удадение/изменение"""
 
+    cache_scopes = ('recipes', 'tags', 'ingredients', 'users', 'popularity')
+    replica_anonymous_only = True
+    # Лента изменений придерживает записи только на RECIPE_CHANGES_LAG:
+    # строку, которую реплика ещё не применила, курсор пропустил бы.
+    primary_actions = ('changes',)
+    async_read_actions = ('list', 'retrieve')
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
-    filter_class = RecipeFilter
-    filterset_fields = ('tags',)
+    filterset_class = RecipeFilter
     permission_classes = (IsAdminAuthorOrReadOnly,)
-    pagination_class = PageLimitPagination
+    pagination_class = RecipePagination
+    renderer_classes = (RawJSONRenderer, BrowsableAPIRenderer)
 
     def get_serializer_class(self):
         if self.action == 'favorite' or self.action == 'shopping_cart':
@@ -69,19 +127,9 @@ class RecipesViewSet(viewsets.ModelViewSet):
         return RecipesWriteSerializer
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
-        author = self.request.user
-        if self.request.GET.get('is_favorited'):
-            favorite_recipes_ids = Favorite.objects.filter(
-                user=author).values('recipe_id')
-
-            return queryset.filter(pk__in=favorite_recipes_ids)
-
-        if self.request.GET.get('is_in_shopping_cart'):
-            cart_recipes_ids = ShoppingCart.objects.filter(
-                user=author).values('recipe_id')
-            return queryset.filter(pk__in=cart_recipes_ids)
-        return queryset
+        return order_by_popularity(
+            Recipe.objects.all(), self.request.GET.get('ordering')
+        )
 
     @action(
         detail=True,
@@ -133,6 +181,80 @@ class RecipesViewSet(viewsets.ModelViewSet):
             error_message
         )
 
+    @action(detail=True, methods=['get'], pagination_class=None)
+    def similar(self, request, pk):
+        """Рецепты с самым похожим набором ингредиентов."""
+        recipe = get_object_or_404(Recipe, id=pk)
+        similar_ids = list(recipe.similar.order_by('-score').values_list(
+            'similar_id', flat=True
+        ))
+        recipes = Recipe.objects.in_bulk(similar_ids)
+        serializer = self.get_serializer(
+            [recipes[i] for i in similar_ids if i in recipes], many=True
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=(AllowAny,))
+    def cookable(self, request):
+        """
+        Рецепты, которые можно приготовить из присланных ингредиентов:
+        сначала те, где не хватает меньше ингредиентов.
+        """
+        serializer = CookableSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        found = self.paginate_queryset(ingredient_index.search(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data['max_missing'],
+        ))
+        recipes = Recipe.objects.in_bulk([pk for pk, _ in found])
+        found = [(recipes[pk], missing) for pk, missing in found
+                 if pk in recipes]
+        cards = self.get_serializer(
+            [recipe for recipe, _ in found], many=True
+        ).data
+        for card, (_, missing) in zip(cards, found):
+            card['missing_ingredients'] = missing
+        return self.get_paginated_response(cards)
+
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def changes(self, request):
+        """
+        Рецепты, созданные или изменённые после курсора since, и id
+        удалённых рецептов. В next возвращается курсор для следующего
+        запроса; has_more означает, что изменения ещё остались.
+        """
+        since = request.query_params.get('since')
+        stream, has_more = get_recipe_changes(
+            decode_cursor(since) if since else None,
+            get_keyset_limit(request, CHANGES_PAGE_SIZE),
+        )
+        changed = [item for _, kind, _, item in stream
+                   if kind == RECIPE_CHANGE]
+        return Response({
+            'next': encode_cursor(*stream[-1][:3]) if stream else since,
+            'has_more': has_more,
+            'results': self.get_serializer(changed, many=True).data,
+            'deleted': [item.recipe_id for _, kind, _, item in stream
+                        if kind != RECIPE_CHANGE],
+        })
+
+    @action(
+        detail=False, methods=['get'], pagination_class=None,
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, от новых к старым."""
+        cursor = request.query_params.get('cursor')
+        recipes, last = get_feed(
+            request.user,
+            decode_cursor(cursor, 'cursor') if cursor else None,
+            get_keyset_limit(request, FEED_PAGE_SIZE),
+        )
+        return Response({
+            'next': encode_cursor(last[0], 0, last[1]) if last else None,
+            'results': self.get_serializer(recipes, many=True).data,
+        })
+
     @action(
         detail=False,
         methods=['get'],
@@ -142,7 +264,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
         """Выгрузка списка покупок"""
         cart_ingredients = (
             RecipeIngredient.objects.filter(
-                recipe__shopping_cart__user=request.user
+                recipe__shoppingcart__user=request.user
             )
             .values(
                 'ingredient__name',
@@ -154,6 +276,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
 
 
 class UserSubscriptionsViewSet(
+    AnonymousCacheMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -161,6 +284,8 @@ class UserSubscriptionsViewSet(
 ):
     """Получение списка всех подписок."""
 
+    cache_scopes = ('users',)
+    async_read_actions = ('subscriptions',)
     pagination_class = PageLimitPagination
     serializer_class = UserSubscribeRepresentSerializer
     permission_classes = (AllowAny,)
@@ -188,6 +313,7 @@ class UserSubscriptionsViewSet(
         serializer = SetPasswordSerializer(request.user, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        revoke_user_tokens(request.user.id)
         return Response(
             {'detail': 'Пароль успешно изменен!'},
             status=status.HTTP_204_NO_CONTENT)
@@ -215,3 +341,66 @@ class UserSubscriptionsViewSet(
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         Subscription.objects.filter(user=user, author=author).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SignedTokenViewSet(viewsets.ViewSet):
+    """Выдача, обновление и отзыв подписанных токенов."""
+
+    permission_classes = (AllowAny,)
+
+    @staticmethod
+    def token_response(refresh, status_code=status.HTTP_200_OK):
+        return Response(
+            {'refresh': str(refresh), 'access': str(refresh.access_token)},
+            status=status_code,
+        )
+
+    @staticmethod
+    def get_refresh_token(request):
+        try:
+            refresh = RefreshToken(request.data.get('refresh'))
+        except TokenError as error:
+            raise InvalidToken(error.args[0])
+        check_not_revoked(refresh)
+        return refresh
+
+    @action(detail=False, methods=['post'], url_path='create')
+    def create_token(self, request):
+        serializer = djoser_settings.SERIALIZERS.token_create(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        return self.token_response(
+            issue_tokens(serializer.user), status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['post'])
+    def refresh(self, request):
+        """
+        Меняет refresh-токен на новую пару. Пользователь читается из
+        БД, чтобы новые claims были актуальны. Старый токен уходит в
+        denylist до выдачи новой пары: из параллельных обменов одного
+        токена проходит только первый.
+        """
+        refresh = self.get_refresh_token(request)
+        user = User.objects.filter(
+            pk=refresh['user_id'], is_active=True
+        ).first()
+        if user is None:
+            raise InvalidToken('Пользователь не найден или неактивен.')
+        if not deny_token(refresh):
+            raise InvalidToken('Токен отозван.')
+        return self.token_response(issue_tokens(user))
+
+    @action(
+        detail=False, methods=['post'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def logout(self, request):
+        if isinstance(request.auth, AccessToken):
+            deny_token(request.auth)
+        if request.data.get('refresh'):
+            refresh = self.get_refresh_token(request)
+            if refresh['user_id'] == request.user.id:
+                deny_token(refresh)
+        return Response(status=status.HTTP_204_NO_CONTENT)
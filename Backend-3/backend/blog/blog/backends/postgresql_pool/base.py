@@ -0,0 +1,131 @@
+"""
+PostgreSQL с пулом соединений внутри процесса для воркеров с потоками.
+
+Django закрывает соединение в конце запроса (CONN_MAX_AGE = 0), а
+этот бэкенд вместо закрытия возвращает его в пул, и следующий запрос
+не платит за TCP и аутентификацию. Размер пула ограничивает число
+соединений одного воркера; если свободных нет, запрос ждёт
+POOL_TIMEOUT секунд.
+
+Параметры в OPTIONS: POOL_MIN_SIZE, POOL_MAX_SIZE, POOL_TIMEOUT,
+POOL_PRE_PING (проверять соединение запросом SELECT 1 при выдаче).
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from psycopg2 import extras, pool
+
+POOL_OPTIONS = {
+    'POOL_MIN_SIZE': 1,
+    'POOL_MAX_SIZE': 10,
+    'POOL_TIMEOUT': 10,
+    'POOL_PRE_PING': True,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Пул psycopg2 с ожиданием свободного соединения и счётчиками."""
+
+    def __init__(self, params, min_size, max_size, timeout, pre_ping):
+        self.pool = pool.ThreadedConnectionPool(min_size, max_size, **params)
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.in_use = 0
+        self.counter_lock = threading.Lock()
+
+    def get(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f'Нет свободных соединений в пуле за {self.timeout} с.'
+            )
+        try:
+            connection = self.pool.getconn()
+            if self.pre_ping and not self.is_usable(connection):
+                self.pool.putconn(connection, close=True)
+                connection = self.pool.getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        with self.counter_lock:
+            self.in_use += 1
+        return connection
+
+    def put(self, connection):
+        # Незавершённую транзакцию пул откатит сам.
+        self.pool.putconn(connection, close=bool(connection.closed))
+        with self.counter_lock:
+            self.in_use -= 1
+        self.slots.release()
+
+    @staticmethod
+    def is_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def stats(self):
+        return {'in_use': self.in_use, 'max_size': self.max_size}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pool(self, params):
+        options = {
+            name: self.settings_dict['OPTIONS'].get(name, default)
+            for name, default in POOL_OPTIONS.items()
+        }
+        if self.settings_dict['CONN_MAX_AGE']:
+            raise ImproperlyConfigured(
+                'С пулом соединений CONN_MAX_AGE должен быть 0.'
+            )
+        with _pools_lock:
+            if self.alias not in _pools:
+                _pools[self.alias] = ConnectionPool(
+                    params,
+                    options['POOL_MIN_SIZE'],
+                    options['POOL_MAX_SIZE'],
+                    options['POOL_TIMEOUT'],
+                    options['POOL_PRE_PING'],
+                )
+            return _pools[self.alias]
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in POOL_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).get()
+        # То же, что делает родительский класс после psycopg2.connect();
+        # кодировку и часовой пояс Django выставит в init_connection_state.
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                _pools[self.alias].put(self.connection)
+
+    def pool_stats(self):
+        pool = _pools.get(self.alias)
+        return pool.stats() if pool is not None else None
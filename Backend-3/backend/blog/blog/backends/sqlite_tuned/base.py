@@ -0,0 +1,45 @@
+"""
+SQLite для небольших установок без PostgreSQL.
+
+Каждое новое соединение переводится в режим WAL (читатели не
+блокируют писателя), synchronous=NORMAL, получает mmap, кэш страниц
+и busy_timeout. Транзакции начинаются с BEGIN IMMEDIATE: блокировка
+на запись берётся сразу, и две транзакции вида «прочитать, потом
+записать» ждут друг друга по busy_timeout, а не падают с
+«database is locked» при попытке повысить блокировку.
+
+Значения PRAGMA можно переопределить в OPTIONS['pragmas'].
+"""
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3 import base
+from django.dispatch import receiver
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ.
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_pragmas(self):
+        return {**PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
+
+
+@receiver(connection_created, sender=DatabaseWrapper)
+def apply_pragmas(sender, connection, **kwargs):
+    with connection.cursor() as cursor:
+        for name, value in connection.get_pragmas().items():
+            cursor.execute(f'PRAGMA {name} = {value}')
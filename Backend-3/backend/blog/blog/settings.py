@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -30,11 +31,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryTimingMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.replicas.ReplicaStickinessMiddleware',
+    'api.middleware.StatementTimeoutMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,29 +64,84 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'blog.wsgi.application'
+ASGI_APPLICATION = 'blog.asgi.application'
+
+# ASYNC_READ_VIEWS=True (под ASGI, см. gunicorn.conf.py): горячие чтения
+# обслуживают асинхронные вьюхи, ORM и сериализация выполняются в пуле
+# из ASYNC_READ_THREADS потоков, у каждого своё соединение с БД.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', False) == 'True'
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', 10))
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+# DB_POOL=True включает пул соединений внутри процесса (для воркеров
+# с потоками); без него соединения живут DB_CONN_MAX_AGE секунд.
+DB_POOL_ENABLED = os.getenv('DB_POOL', False) == 'True'
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', False) == 'True'
+
 if os.getenv('POSTGRES_ON', False) == 'True':
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': (
+                'blog.backends.postgresql_pool' if DB_POOL_ENABLED
+                else 'django.db.backends.postgresql'
+            ),
             'NAME': os.getenv('POSTGRES_DB', 'django'),
             'USER': os.getenv('POSTGRES_USER', 'django'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', ''),
-            'PORT': os.getenv('DB_PORT', 5432)
+            'PORT': os.getenv('DB_PORT', 5432),
+            'CONN_MAX_AGE': (
+                0 if DB_POOL_ENABLED
+                else int(os.getenv('DB_CONN_MAX_AGE', 60))
+            ),
+            'OPTIONS': {
+                'POOL_MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                'POOL_MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                'POOL_TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            } if DB_POOL_ENABLED else {},
         }
     }
 else:
+    # SQLITE_TUNED=True: WAL, PRAGMA и BEGIN IMMEDIATE для работы
+    # под несколькими воркерами gunicorn.
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': (
+                'blog.backends.sqlite_tuned'
+                if os.getenv('SQLITE_TUNED', False) == 'True'
+                else 'django.db.backends.sqlite3'
+            ),
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
 
+# Реплики для чтения: хосты PostgreSQL с теми же учётными данными или,
+# для локальной проверки, копии файла SQLite.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv(
+    'DB_REPLICA_HOSTS' if os.getenv('POSTGRES_ON', False) == 'True'
+    else 'SQLITE_REPLICAS', ''
+).split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if os.getenv('POSTGRES_ON', False) == 'True':
+        DATABASES[alias]['HOST'] = replica.strip()
+    else:
+        DATABASES[alias]['NAME'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 2))
+REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -156,3 +217,103 @@ LENGTH_FIELDS_RECIPES = 255
 LENGTH_FIELDS_FOR_USER = 150
 LENGTH_FIELDS_COLOR = 7
 LENGTH_FIELDS_MEASUR = 10
+
+QUERY_TIMING_ENABLED = os.getenv('QUERY_TIMING', False) == 'True'
+QUERY_TIMING_LOG_SAMPLE_RATE = float(os.getenv('QUERY_TIMING_SAMPLE_RATE', 0))
+
+METRICS_ENABLED = os.getenv('METRICS', False) == 'True'
+
+STATEMENT_TIMEOUT_ENABLED = os.getenv('STATEMENT_TIMEOUT', False) == 'True'
+STATEMENT_TIMEOUTS = {
+    'default': int(os.getenv('STATEMENT_TIMEOUT_MS', 5000)),
+    'anonymous_list': int(os.getenv('STATEMENT_TIMEOUT_ANONYMOUS_MS', 2000)),
+    'download_shopping_cart': int(
+        os.getenv('STATEMENT_TIMEOUT_CART_MS', 30000)
+    ),
+    'admin': int(os.getenv('STATEMENT_TIMEOUT_ADMIN_MS', 30000)),
+}
+STATEMENT_TIMEOUT_RETRY_AFTER = int(
+    os.getenv('STATEMENT_TIMEOUT_RETRY_AFTER', 5)
+)
+
+# По умолчанию детектор включён вместе с DEBUG; NPLUSONE переопределяет.
+NPLUSONE_ENABLED = os.getenv('NPLUSONE', os.getenv('DEBUG', False)) == 'True'
+NPLUSONE_RAISE = os.getenv('NPLUSONE_RAISE', False) == 'True'
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+API_CACHE_ENABLED = os.getenv('API_CACHE', False) == 'True'
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', 60))
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', 10))
+
+RECIPE_CARD_CACHE_ENABLED = os.getenv('RECIPE_CARD_CACHE', False) == 'True'
+RECIPE_CARD_CACHE_TIMEOUT = int(os.getenv('RECIPE_CARD_CACHE_TIMEOUT', 86400))
+RECIPE_JSON_FAST_PATH = os.getenv('RECIPE_JSON_FAST_PATH', False) == 'True'
+RECIPE_CARD_PROJECTION_ENABLED = (
+    os.getenv('RECIPE_CARD_PROJECTION', False) == 'True'
+)
+
+RECIPE_CHANGES_LAG = int(os.getenv('RECIPE_CHANGES_LAG', 1))
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 1000))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+FEED_CELEBRITY_CACHE_TIMEOUT = int(
+    os.getenv('FEED_CELEBRITY_CACHE_TIMEOUT', 300)
+)
+
+POPULARITY_HALF_LIFE_HOURS = float(
+    os.getenv('POPULARITY_HALF_LIFE_HOURS', 72)
+)
+
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', 10))
+
+COOKABLE_REFRESH_INTERVAL = int(os.getenv('COOKABLE_REFRESH_INTERVAL', 5))
+COOKABLE_MAX_MISSING = int(os.getenv('COOKABLE_MAX_MISSING', 2))
+
+JWT_AUTH_ENABLED = os.getenv('JWT_AUTH', False) == 'True'
+JWT_REVOCATION_CACHE_TTL = int(os.getenv('JWT_REVOCATION_CACHE_TTL', 5))
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(
+        minutes=int(os.getenv('JWT_ACCESS_MINUTES', 5))
+    ),
+    'REFRESH_TOKEN_LIFETIME': timedelta(
+        days=int(os.getenv('JWT_REFRESH_DAYS', 7))
+    ),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+}
+
+if JWT_AUTH_ENABLED:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(
+        0, 'api.authentication.SignedTokenAuthentication'
+    )
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'api.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
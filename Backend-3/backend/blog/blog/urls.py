@@ -8,6 +8,10 @@ urlpatterns = [
     path('api/', include('api.urls')),
 ]
 
+if settings.METRICS_ENABLED:
+    from api.metrics import metrics_view
+
+    urlpatterns.append(path('metrics', metrics_view))
 
 if settings.DEBUG:
     urlpatterns += static(
@@ -0,0 +1,29 @@
+import os
+import shutil
+
+bind = '0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 3))
+# С потоками соединения с БД стоит брать из пула (DB_POOL=True).
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+# ASGI=True: uvicorn-воркеры и blog.asgi, нужно для асинхронных вьюх
+# (ASYNC_READ_VIEWS=True).
+if os.getenv('ASGI', False) == 'True':
+    wsgi_app = 'blog.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'blog.wsgi:application'
+
+
+def on_starting(server):
+    """Очищает каталог метрик, оставшийся от прошлого запуска."""
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
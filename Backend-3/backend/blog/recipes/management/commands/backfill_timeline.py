@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recipes.timeline import backfill
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписчиков по уже существующим подпискам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int,
+            help='Заполнить ленту только этого пользователя',
+        )
+        parser.add_argument(
+            '--size', type=int,
+            help='Сколько последних рецептов автора добавить в ленту',
+        )
+
+    def handle(self, *args, **options):
+        subscriptions = Subscription.objects.order_by('pk')
+        if options['user']:
+            subscriptions = subscriptions.filter(user_id=options['user'])
+        count = 0
+        for user_id, author_id in subscriptions.values_list(
+            'user_id', 'author_id'
+        ).iterator():
+            backfill(user_id, author_id, options['size'])
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано подписок: {count}')
+        )
@@ -0,0 +1,99 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ('/api/recipes/', '/api/tags/', '/api/ingredients/')
+
+
+async def fetch(host, port, path, headers):
+    """Один GET по отдельному соединению: статус ответа."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        lines = [f'GET {path} HTTP/1.1', f'Host: {host}',
+                 'Connection: close', *headers, '', '']
+        writer.write('\r\n'.join(lines).encode())
+        await writer.drain()
+        data = await reader.read()
+    finally:
+        writer.close()
+    return int(data.split(b' ', 2)[1])
+
+
+async def run_target(url, paths, connections, total, headers):
+    """
+    connections клиентов одновременно отправляют запросы по кругу
+    путей, пока не наберётся total. Возвращает время, задержки и
+    число ошибок.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    counter = iter(range(total))
+    latencies = []
+    errors = 0
+
+    async def client():
+        nonlocal errors
+        for number in counter:
+            path = parts.path.rstrip('/') + paths[number % len(paths)]
+            started = time.perf_counter()
+            try:
+                status = await fetch(host, port, path, headers)
+            except (OSError, IndexError, ValueError):
+                status = None
+            latencies.append(time.perf_counter() - started)
+            if status is None or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return time.perf_counter() - started, latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность развёртываний (WSGI и ASGI) '
+        'на горячих чтениях при большом числе одновременных соединений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='+', metavar='NAME=URL',
+            help='например wsgi=http://127.0.0.1:8000 '
+                 'asgi=http://127.0.0.1:8001',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='путь для запросов, можно указать несколько раз',
+        )
+        parser.add_argument('--connections', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--token', help='токен для эндпоинтов, требующих авторизации'
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['targets']:
+            name, separator, url = target.partition('=')
+            if not separator or not url.startswith('http://'):
+                raise CommandError(f'Ожидается NAME=http://...: {target}')
+            targets.append((name, url))
+        paths = options['paths'] or DEFAULT_PATHS
+        headers = []
+        if options['token']:
+            headers.append(f'Authorization: Token {options["token"]}')
+        for name, url in targets:
+            elapsed, latencies, errors = asyncio.run(run_target(
+                url, paths, options['connections'], options['requests'],
+                headers,
+            ))
+            latencies.sort()
+            self.stdout.write(
+                f'{name}: {len(latencies) / elapsed:.0f} запросов/с, '
+                f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+                f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} мс, '
+                f'ошибок: {errors}'
+            )
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ENGINES = {
+    'default': 'django.db.backends.sqlite3',
+    'tuned': 'blog.backends.sqlite_tuned',
+}
+
+
+def writer(alias, deadline, results):
+    """Транзакции «прочитать, потом записать», как при создании рецепта."""
+    done = failed = 0
+    connection = connections[alias]
+    try:
+        while time.monotonic() < deadline:
+            try:
+                with transaction.atomic(using=alias):
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT COUNT(*) FROM bench_rows')
+                        count = cursor.fetchone()[0]
+                        cursor.execute(
+                            'INSERT INTO bench_rows (value) VALUES (%s)',
+                            [count],
+                        )
+                done += 1
+            except OperationalError:
+                failed += 1
+    finally:
+        connection.close()
+    results.append((done, failed))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентную запись в SQLite с настройками по '
+        'умолчанию и в режиме sqlite_tuned на временных базах'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        for mode, engine in ENGINES.items():
+            alias = f'bench_{mode}'
+            connections.databases[alias] = {
+                **connections.databases['default'],
+                'ENGINE': engine,
+                'NAME': os.path.join(directory, f'{mode}.sqlite3'),
+                'OPTIONS': {},
+            }
+            with connections[alias].cursor() as cursor:
+                cursor.execute(
+                    'CREATE TABLE bench_rows '
+                    '(id INTEGER PRIMARY KEY, value INTEGER)'
+                )
+            results = []
+            deadline = time.monotonic() + options['seconds']
+            threads = [
+                threading.Thread(
+                    target=writer, args=(alias, deadline, results)
+                )
+                for _ in range(options['threads'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            done = sum(item[0] for item in results)
+            failed = sum(item[1] for item in results)
+            self.stdout.write(
+                f'{mode}: {done / options["seconds"]:.0f} транзакций/с, '
+                f'ошибок «database is locked»: {failed}'
+            )
+            connections[alias].close()
@@ -0,0 +1,70 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.partitioning import PARTITIONED_MODELS
+from users.models import User
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет скорость вставки и поиска по пользователю в избранном '
+        'и списках покупок. Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--lookups', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        recipe_ids = list(Recipe.objects.values_list('pk', flat=True))
+        if not user_ids or not recipe_ids:
+            raise CommandError('Нужны пользователи и рецепты.')
+        for model in PARTITIONED_MODELS:
+            with transaction.atomic():
+                self.bench(model, user_ids, recipe_ids, options)
+                transaction.set_rollback(True)
+
+    def bench(self, model, user_ids, recipe_ids, options):
+        generator = random.Random(options['seed'])
+        pairs = list({
+            (generator.choice(user_ids), generator.choice(recipe_ids))
+            for _ in range(options['rows'])
+        })
+        size = options['batch_size']
+        started = time.perf_counter()
+        for start in range(0, len(pairs), size):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in pairs[start:start + size]
+                ),
+                ignore_conflicts=True,
+            )
+        elapsed = time.perf_counter() - started
+        timings = []
+        for _ in range(options['lookups']):
+            user_id, recipe_id = generator.choice(pairs)
+            started = time.perf_counter()
+            list(model.objects.filter(user_id=user_id).values_list(
+                'recipe_id', flat=True
+            ))
+            model.objects.filter(user_id=user_id, recipe_id=recipe_id).exists()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'{model._meta.db_table}: вставка {len(pairs) / elapsed:.0f} '
+            f'строк/с, поиск p50 {statistics.median(timings):.2f} мс, '
+            f'p95 {percentile(timings, 0.95):.2f} мс'
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_full, build_incremental
+
+
+class Command(BaseCommand):
+    help = 'Строит индекс похожих рецептов по ингредиентам (MinHash/LSH)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Перестроить индекс для всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        if options['full']:
+            count = build_full()
+        else:
+            count = build_incremental()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано рецептов: {count}')
+        )
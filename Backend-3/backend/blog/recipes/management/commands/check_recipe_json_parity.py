@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.fragments import render_public
+from api.recipe_json import read_connection, render_documents
+from recipes.models import Recipe
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает карточки рецептов из PostgreSQL (json_build_object) '
+        'с выводом RecipesReadSerializer побайтно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Сколько рецептов проверить (по умолчанию все)',
+        )
+
+    def handle(self, *args, **options):
+        if read_connection().vendor != 'postgresql':
+            raise CommandError('Быстрый путь работает только на PostgreSQL.')
+        renderer = JSONRenderer()
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[:options['limit']])
+        checked = 0
+        mismatched = []
+        for start in range(0, len(recipe_ids), CHUNK_SIZE):
+            recipes = list(Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + CHUNK_SIZE]
+            ))
+            expected = render_public(recipes)
+            actual = render_documents(recipes)
+            for recipe, document in zip(recipes, actual):
+                checked += 1
+                card = renderer.render(expected[recipe.id]).decode()
+                if card != document:
+                    mismatched.append(recipe.id)
+                    self.stdout.write(f'Рецепт {recipe.id}:')
+                    self.stdout.write(card)
+                    self.stdout.write(document)
+        if mismatched:
+            raise CommandError(
+                f'Расхождения в {len(mismatched)} из {checked} рецептов.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Совпадают все проверенные рецепты: {checked}'
+        ))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+
+from recipes.models import Recipe, RecipeIngredient
+from users.models import Subscription
+
+
+def hot_paths(user_id):
+    """Запросы горячих путей и индексы, которые они должны использовать."""
+    return (
+        (
+            'Рецепты автора',
+            Recipe.objects.filter(author_id=user_id)[:6],
+            'recipe_author_pub_date_idx',
+        ),
+        (
+            'Лента рецептов',
+            Recipe.objects.all()[:6],
+            'recipe_pub_date_idx',
+        ),
+        (
+            'Выгрузка списка покупок',
+            RecipeIngredient.objects.filter(
+                recipe__shoppingcart__user_id=user_id
+            ).values(
+                'ingredient__name', 'ingredient__measurement_unit'
+            ).annotate(total=Sum('amount')),
+            'unique_recipe_ingredient',
+        ),
+        (
+            'Подписчики автора',
+            Subscription.objects.filter(author_id=user_id).values_list(
+                'user_id', flat=True
+            ),
+            'subscription_author_user_idx',
+        ),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы запросов горячих путей и проверяет, '
+        'что они используют свои индексы. Планировщик работает с '
+        'настройками по умолчанию: на маленьких таблицах seq scan '
+        'дешевле, и проверка имеет смысл на рабочих данных'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=1,
+            help='id пользователя и автора для запросов',
+        )
+
+    def handle(self, *args, **options):
+        missing = []
+        for title, queryset, index in hot_paths(options['user']):
+            plan = queryset.explain()
+            used = index in plan
+            self.stdout.write(f'{title}: {"OK" if used else "НЕТ"}')
+            self.stdout.write(plan)
+            if not used:
+                missing.append(index)
+        if missing:
+            raise CommandError(
+                f'Не используются индексы: {", ".join(missing)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Все индексы используются'))
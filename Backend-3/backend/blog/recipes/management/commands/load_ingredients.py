@@ -5,6 +5,8 @@ import os
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from api.cache import bump_version
+from api.snapshots import bump_data_version
 from recipes.models import Ingredient
 
 logging.basicConfig(
@@ -40,4 +42,6 @@ class Command(BaseCommand):
                     )
         except FileNotFoundError:
             raise CommandError('Добавьте файл ingredients в директорию data')
+        bump_version('ingredients')
+        bump_data_version('ingredients')
         logging.info('Успешно загружены все данные в базу данных')
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.partitioning import (
+    OLD_SUFFIX,
+    PARTITIONED_MODELS,
+    partition_statements,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит избранное и списки покупок в таблицы, '
+        'секционированные по хешу user_id (PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=16,
+            help='Количество секций',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только напечатать SQL',
+        )
+        parser.add_argument(
+            '--drop-old', action='store_true',
+            help='Удалить старые таблицы после переноса',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL.')
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Внешние ключи Django отложенные: без этого INSERT копии
+            # оставляет проверки до коммита, и PostgreSQL запрещает
+            # ALTER TABLE и DROP TABLE с «pending trigger events».
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            for model in PARTITIONED_MODELS:
+                table = model._meta.db_table
+                cursor.execute(
+                    'SELECT 1 FROM pg_partitioned_table '
+                    'WHERE partrelid = %s::regclass', [table]
+                )
+                if cursor.fetchone():
+                    self.stdout.write(f'{table} уже секционирована')
+                    continue
+                cursor.execute(
+                    'SELECT pg_get_serial_sequence(%s, %s)', [table, 'id']
+                )
+                statements = partition_statements(
+                    model, options['partitions'], cursor.fetchone()[0]
+                )
+                if options['drop_old']:
+                    statements.append(f'DROP TABLE {table}{OLD_SUFFIX}')
+                # Перенос блокирует таблицу до конца транзакции.
+                cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+                for statement in statements:
+                    self.stdout.write(f'{statement};')
+                    if not options['dry_run']:
+                        cursor.execute(statement)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Готово'))
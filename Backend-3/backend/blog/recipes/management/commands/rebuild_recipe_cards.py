@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.fragments import rebuild_projection
+from recipes.models import Recipe
+
+
+def rebuild_chunk(recipe_ids):
+    try:
+        return rebuild_projection(recipe_ids)
+    finally:
+        # У каждого потока своё соединение с БД.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает таблицу карточек рецептов RecipeCard: первое '
+        'заполнение и восстановление, дальше её поддерживают записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько рецептов собирать за раз',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько пачек собирать параллельно',
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        size = options['chunk_size']
+        chunks = [
+            recipe_ids[start:start + size]
+            for start in range(0, len(recipe_ids), size)
+        ]
+        workers = options['workers']
+        if connection.vendor == 'sqlite':
+            # SQLite допускает только одного писателя.
+            workers = 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rebuilt = sum(pool.map(rebuild_chunk, chunks))
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано карточек: {rebuilt}')
+        )
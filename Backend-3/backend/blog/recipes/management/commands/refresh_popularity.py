@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_version
+from recipes.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярности рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать всё заново, а не только новые события',
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_popularity(full=options['full'])
+        bump_version('popularity')
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлён рейтинг рецептов: {updated}')
+        )
@@ -0,0 +1,78 @@
+# Generated by Django 3.2.19 on 2026-10-19 06:47
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Дата добавления существующих связей неизвестна: ставим дату далеко
+# за окном trending, чтобы они не выглядели свежими.
+UNKNOWN_CREATED_AT = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def create_popularity_rows(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipePopularity = apps.get_model('recipes', 'RecipePopularity')
+    RecipePopularity.objects.bulk_create(
+        RecipePopularity(recipe_id=recipe_id)
+        for recipe_id in Recipe.objects.values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_timeline_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('favorite_high_water', models.BigIntegerField(default=0)),
+                ('cart_high_water', models.BigIntegerField(default=0)),
+                ('epoch', models.DateTimeField(verbose_name='Эпоха расчёта trending')),
+                ('refreshed_at', models.DateTimeField(null=True, verbose_name='Время последнего пересчёта')),
+            ],
+            options={
+                'verbose_name': 'Состояние рейтинга',
+                'verbose_name_plural': 'Состояние рейтинга',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipePopularity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('favorites_count', models.PositiveIntegerField(default=0, verbose_name='В избранном')),
+                ('carts_count', models.PositiveIntegerField(default=0, verbose_name='В списках покупок')),
+                ('score', models.FloatField(default=0, verbose_name='Популярность за всё время')),
+                ('trending', models.FloatField(default=0, help_text='Сумма весов событий, приведённых к эпохе расчёта', verbose_name='Популярность с затуханием')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=UNKNOWN_CREATED_AT, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=UNKNOWN_CREATED_AT, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipepopularity',
+            index=models.Index(fields=['-score', '-recipe'], name='popularity_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipepopularity',
+            index=models.Index(fields=['-trending', '-recipe'], name='popularity_trending_idx'),
+        ),
+        migrations.RunPython(create_popularity_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.19 on 2026-10-19 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_card'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='popularitystate',
+            name='cart_high_water',
+        ),
+        migrations.RemoveField(
+            model_name='popularitystate',
+            name='favorite_high_water',
+        ),
+        migrations.AddField(
+            model_name='popularitystate',
+            name='events_until',
+            field=models.DateTimeField(null=True, verbose_name='События учтены по'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['created_at'], name='favorite_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['created_at'], name='cart_created_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.19 on 2026-10-19 09:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def mark_celebrities(apps, schema_editor):
+    Subscription = apps.get_model('users', 'Subscription')
+    CelebrityAuthor = apps.get_model('recipes', 'CelebrityAuthor')
+    CelebrityAuthor.objects.bulk_create(
+        CelebrityAuthor(author_id=author_id)
+        for author_id in Subscription.objects.values('author').annotate(
+            followers=Count('pk')
+        ).filter(
+            followers__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('author', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0003_subscription_author_index'),
+        ('recipes', '0012_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CelebrityAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Автор-знаменитость',
+                'verbose_name_plural': 'Авторы-знаменитости',
+            },
+        ),
+        migrations.RunPython(mark_celebrities, migrations.RunPython.noop),
+    ]
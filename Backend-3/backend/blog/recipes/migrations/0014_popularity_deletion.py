@@ -0,0 +1,31 @@
+# Generated by Django 3.2.19 on 2026-10-19 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_celebrity_author'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(verbose_name='Рецепт')),
+                ('in_cart', models.BooleanField(verbose_name='Из списка покупок')),
+                ('created_at', models.DateTimeField(verbose_name='Дата добавления')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удаление из избранного или покупок',
+                'verbose_name_plural': 'Удаления из избранного и покупок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='popularitydeletion',
+            index=models.Index(fields=['deleted_at'], name='popularity_deleted_at_idx'),
+        ),
+    ]
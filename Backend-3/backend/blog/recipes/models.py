@@ -103,16 +103,119 @@ class Recipe(models.Model):
         verbose_name='Дата создания рецепта',
         help_text='Введите дату создания рецепта',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения рецепта',
+        help_text='Меняется при правке рецепта, его ингредиентов и тегов',
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('updated_at', 'id'), name='recipe_updated_at_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx',
+            ),
+            models.Index(fields=('-pub_date',), name='recipe_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeDeletion(models.Model):
+    """Журнал удалённых рецептов для синхронизации клиентов."""
+    recipe_id = models.BigIntegerField(verbose_name='Рецепт')
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата удаления',
+    )
+
+    class Meta:
+        verbose_name = 'Удалённый рецепт'
+        verbose_name_plural = 'Удалённые рецепты'
+        indexes = [
+            models.Index(
+                fields=('deleted_at', 'id'), name='recipe_deletion_at_id_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} удалён {self.deleted_at}'
+
+
+class TimelineEntry(models.Model):
+    """Рецепт в ленте подписчика, записанный при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_timeline_user_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'), name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+
+class CelebrityAuthor(models.Model):
+    """
+    Автор, у которого подписчиков больше FEED_FANOUT_LIMIT. Запись
+    фиксирует переход через порог: при её удалении ленты подписчиков
+    догоняют рецепты, которые в это время не раскладывались.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name = 'Автор-знаменитость'
+        verbose_name_plural = 'Авторы-знаменитости'
+
+    def __str__(self):
+        return str(self.author_id)
+
+
 class RecipeIngredient(models.Model):
     """Модель списка ингредиентов."""
 
@@ -147,8 +250,10 @@ class RecipeIngredient(models.Model):
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецепте'
         constraints = [
+            # Выгрузка списка покупок читает amount только из индекса.
             models.UniqueConstraint(
                 fields=['recipe', 'ingredient'],
+                include=['amount'],
                 name='unique_recipe_ingredient'
             )
         ]
@@ -171,6 +276,10 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Рецепт',
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         verbose_name = 'Список избранного'
@@ -181,6 +290,9 @@ class Favorite(models.Model):
                 name='unique_favorites'
             )
         ]
+        indexes = [
+            models.Index(fields=['created_at'], name='favorite_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} {self.recipe}'
@@ -202,6 +314,10 @@ class ShoppingCart(models.Model):
         verbose_name='Рецепт в списке покупок',
         help_text='Рецепт в списке покупок',
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         ordering = ['-id']
@@ -211,9 +327,236 @@ class ShoppingCart(models.Model):
                 name='unique_user_recipe_cart'
             )
         ]
+        indexes = [
+            models.Index(fields=['created_at'], name='cart_created_idx'),
+        ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
 
     def __str__(self):
         return (f'{self.user.username} добавил'
                 f'{self.recipe.name} в список покупок')
+
+
+class RecipePopularity(models.Model):
+    """Рейтинг рецепта по избранному и спискам покупок."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        verbose_name='Рецепт',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В избранном',
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В списках покупок',
+    )
+    score = models.FloatField(
+        default=0,
+        verbose_name='Популярность за всё время',
+    )
+    trending = models.FloatField(
+        default=0,
+        verbose_name='Популярность с затуханием',
+        help_text='Сумма весов событий, приведённых к эпохе расчёта',
+    )
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+        indexes = [
+            models.Index(
+                fields=('-score', '-recipe'), name='popularity_score_idx'
+            ),
+            models.Index(
+                fields=('-trending', '-recipe'), name='popularity_trending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.score}'
+
+
+class PopularityState(models.Model):
+    """Докуда учтены события при последнем пересчёте рейтинга."""
+    events_until = models.DateTimeField(
+        null=True,
+        verbose_name='События учтены по',
+    )
+    epoch = models.DateTimeField(verbose_name='Эпоха расчёта trending')
+    refreshed_at = models.DateTimeField(
+        null=True,
+        verbose_name='Время последнего пересчёта',
+    )
+
+    class Meta:
+        verbose_name = 'Состояние рейтинга'
+        verbose_name_plural = 'Состояние рейтинга'
+
+    def __str__(self):
+        return f'Рейтинг пересчитан {self.refreshed_at}'
+
+
+class PopularityDeletion(models.Model):
+    """
+    Журнал удалений из избранного и списков покупок: обычный пересчёт
+    рейтинга вычитает по нему уже учтённые события.
+    """
+    recipe_id = models.BigIntegerField(verbose_name='Рецепт')
+    in_cart = models.BooleanField(verbose_name='Из списка покупок')
+    created_at = models.DateTimeField(verbose_name='Дата добавления')
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата удаления',
+    )
+
+    class Meta:
+        verbose_name = 'Удаление из избранного или покупок'
+        verbose_name_plural = 'Удаления из избранного и покупок'
+        indexes = [
+            models.Index(
+                fields=('deleted_at',), name='popularity_deleted_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} удалён {self.deleted_at}'
+
+
+class RecipeSignature(models.Model):
+    """MinHash-сигнатура набора ингредиентов рецепта."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт',
+    )
+    minhash = models.BinaryField(verbose_name='Сигнатура')
+    built_at = models.DateTimeField(verbose_name='Время расчёта')
+
+    class Meta:
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return f'Сигнатура {self.recipe_id}'
+
+
+class RecipeBucket(models.Model):
+    """LSH-корзина рецепта в одной из полос сигнатуры."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets',
+        verbose_name='Рецепт',
+    )
+    band = models.PositiveSmallIntegerField(verbose_name='Полоса')
+    bucket = models.BigIntegerField(verbose_name='Корзина')
+
+    class Meta:
+        verbose_name = 'LSH-корзина'
+        verbose_name_plural = 'LSH-корзины'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'band'],
+                name='unique_recipe_band'
+            )
+        ]
+        indexes = [
+            models.Index(fields=('band', 'bucket'), name='lsh_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.band}/{self.bucket}'
+
+
+class SimilarRecipe(models.Model):
+    """Ближайший по ингредиентам рецепт."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='Оценка сходства Жаккара')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'), name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.2f}'
+
+
+class RecipeCard(models.Model):
+    """
+    Публичная часть карточки рецепта, собранная заранее. Строка
+    действительна, пока recipe_updated_at совпадает с updated_at
+    рецепта.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        verbose_name='Рецепт',
+    )
+    data = models.TextField(
+        verbose_name='Карточка',
+        help_text='JSON в порядке полей RecipesReadSerializer',
+    )
+    recipe_updated_at = models.DateTimeField(
+        verbose_name='Версия рецепта',
+    )
+
+    class Meta:
+        verbose_name = 'Карточка рецепта'
+        verbose_name_plural = 'Карточки рецептов'
+
+    def __str__(self):
+        return f'Карточка {self.recipe_id}'
+
+
+class DataVersion(models.Model):
+    """
+    Версия справочника (теги, ингредиенты) в БД: её видят все
+    процессы, в отличие от версий в кэше отдельного процесса.
+    """
+    scope = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='Область',
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия',
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.scope}: {self.version}'
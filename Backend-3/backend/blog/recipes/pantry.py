@@ -0,0 +1,115 @@
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from recipes.models import Recipe, RecipeDeletion, RecipeIngredient
+
+
+def load_pairs(recipe_ids=None):
+    """Пары (рецепт, ингредиент) без повторов."""
+    rows = RecipeIngredient.objects.order_by()
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    return np.array(
+        rows.values_list('recipe_id', 'ingredient_id').distinct(),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+
+class IngredientIndex:
+    """
+    Инвертированный индекс в памяти процесса: для каждого ингредиента
+    отсортированный массив id рецептов, в которых он есть, и число
+    ингредиентов каждого рецепта. Обновляется по рецептам, у которых
+    сдвинулся updated_at, и по журналу удалений.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pairs = None
+        self.updated_at = None
+        self.deleted_at = None
+        self.checked_at = 0
+
+    def arrays(self):
+        """Снимок индекса, обновлённый не реже COOKABLE_REFRESH_INTERVAL."""
+        if self.pairs is None or time.monotonic() - self.checked_at >= (
+            settings.COOKABLE_REFRESH_INTERVAL
+        ):
+            with self.lock:
+                if self.pairs is None:
+                    self.rebuild()
+                else:
+                    self.refresh()
+                self.checked_at = time.monotonic()
+        return self.state
+
+    def marks(self):
+        return (
+            Recipe.objects.aggregate(value=Max('updated_at'))['value'],
+            RecipeDeletion.objects.aggregate(value=Max('deleted_at'))['value'],
+        )
+
+    def rebuild(self):
+        self.updated_at, self.deleted_at = self.marks()
+        self.store(load_pairs())
+
+    def refresh(self):
+        # Транзакция, начатая раньше, может зафиксироваться позже,
+        # поэтому последние RECIPE_CHANGES_LAG секунд читаются повторно.
+        lag = timedelta(seconds=settings.RECIPE_CHANGES_LAG)
+        updated_at, deleted_at = self.marks()
+        recipes = Recipe.objects.all()
+        if self.updated_at is not None:
+            recipes = recipes.filter(updated_at__gt=self.updated_at - lag)
+        deletions = RecipeDeletion.objects.all()
+        if self.deleted_at is not None:
+            deletions = deletions.filter(deleted_at__gt=self.deleted_at - lag)
+        changed = set(recipes.values_list('pk', flat=True))
+        changed.update(deletions.values_list('recipe_id', flat=True))
+        self.updated_at, self.deleted_at = updated_at, deleted_at
+        if not changed:
+            return
+        ids = np.fromiter(changed, dtype=np.int64)
+        kept = self.pairs[~np.isin(self.pairs[:, 0], ids)]
+        self.store(np.concatenate([kept, load_pairs(ids)]))
+
+    def store(self, pairs):
+        pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+        recipe_ids, counts = np.unique(pairs[:, 0], return_counts=True)
+        self.pairs = pairs
+        self.state = (pairs[:, 1], pairs[:, 0], recipe_ids, counts)
+
+    def search(self, ingredient_ids, max_missing):
+        """
+        Рецепты, для которых из указанных ингредиентов не хватает не
+        больше max_missing: список (id рецепта, не хватает), сначала
+        те, где не хватает меньше.
+        """
+        ingredients, recipes, recipe_ids, counts = self.arrays()
+        wanted = np.unique(np.asarray(ingredient_ids, dtype=np.int64))
+        starts = np.searchsorted(ingredients, wanted, side='left')
+        stops = np.searchsorted(ingredients, wanted, side='right')
+        if not len(wanted) or not (stops - starts).any():
+            return []
+        hits, found = np.unique(
+            np.concatenate([
+                recipes[start:stop] for start, stop in zip(starts, stops)
+            ]),
+            return_counts=True,
+        )
+        missing = counts[np.searchsorted(recipe_ids, hits)] - found
+        keep = missing <= max_missing
+        hits, missing, found = hits[keep], missing[keep], found[keep]
+        order = np.lexsort((hits, -found, missing))
+        return [
+            (int(recipe_id), int(count))
+            for recipe_id, count in zip(hits[order], missing[order])
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,68 @@
+from django.db import models
+
+from recipes.models import Favorite, ShoppingCart
+
+PARTITIONED_MODELS = (Favorite, ShoppingCart)
+PARTITION_KEY = 'user_id'
+OLD_SUFFIX = '_unpartitioned'
+
+
+def unique_constraints(model):
+    return [
+        constraint for constraint in model._meta.constraints
+        if isinstance(constraint, models.UniqueConstraint)
+    ]
+
+
+def partition_statements(model, partitions, sequence):
+    """
+    SQL переноса таблицы модели в секционированную по хешу user_id.
+    Старая таблица переименовывается с суффиксом OLD_SUFFIX, её
+    ограничения тоже, чтобы новые получили прежние имена Django.
+    """
+    table = model._meta.db_table
+    old = f'{table}{OLD_SUFFIX}'
+    new = f'{table}_partitioned'
+    statements = [
+        f'CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS) '
+        f'PARTITION BY HASH ({PARTITION_KEY})',
+        # Первичный и уникальные ключи секционированной таблицы должны
+        # включать ключ секционирования.
+        f'ALTER TABLE {new} ADD PRIMARY KEY (id, {PARTITION_KEY})',
+    ]
+    for field in model._meta.get_fields():
+        if isinstance(field, models.ForeignKey):
+            statements.append(
+                f'ALTER TABLE {new} ADD CONSTRAINT {new}_{field.column}_fk '
+                f'FOREIGN KEY ({field.column}) REFERENCES '
+                f'{field.related_model._meta.db_table} (id) '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+            if field.column != PARTITION_KEY:
+                statements.append(
+                    f'CREATE INDEX {new}_{field.column}_idx '
+                    f'ON {new} ({field.column})'
+                )
+    for remainder in range(partitions):
+        statements.append(
+            f'CREATE TABLE {table}_p{remainder} PARTITION OF {new} '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    statements.append(f'INSERT INTO {new} SELECT * FROM {table}')
+    statements.append(f'ALTER TABLE {table} RENAME TO {old}')
+    for constraint in unique_constraints(model):
+        columns = ', '.join(
+            model._meta.get_field(name).column for name in constraint.fields
+        )
+        statements += [
+            f'ALTER TABLE {old} RENAME CONSTRAINT {constraint.name} '
+            f'TO {constraint.name}{OLD_SUFFIX}',
+            f'ALTER TABLE {new} ADD CONSTRAINT {constraint.name} '
+            f'UNIQUE ({columns})',
+        ]
+    statements += [
+        f'ALTER TABLE {new} RENAME TO {table}',
+        f'ALTER SEQUENCE {sequence} OWNED BY {table}.id',
+        f'ANALYZE {table}',
+    ]
+    return statements
@@ -0,0 +1,193 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite,
+    PopularityDeletion,
+    PopularityState,
+    Recipe,
+    RecipePopularity,
+    ShoppingCart,
+)
+
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 2.0
+BATCH_SIZE = 1000
+# Эпоха сдвигается, когда веса новых событий вырастают в 2**32 раз:
+# exp переполняется примерно на тысячном периоде полураспада.
+REBASE_HALF_LIVES = 32
+EVENTS = (
+    (Favorite, False, FAVORITE_WEIGHT, 0),
+    (ShoppingCart, True, CART_WEIGHT, 1),
+)
+ORDERINGS = {
+    'popular': ('-popularity__score', '-popularity__recipe_id'),
+    'trending': ('-popularity__trending', '-popularity__recipe_id'),
+}
+
+
+def decay_rate():
+    return math.log(2) / (settings.POPULARITY_HALF_LIFE_HOURS * 3600)
+
+
+def event_weight(weight, created_at, epoch):
+    """
+    Вес события, приведённый к эпохе: exp(λ·(t - epoch)). Все рецепты
+    затухают одинаково, поэтому порядок по такой сумме совпадает с
+    порядком по текущему затухшему рейтингу, и старые строки не нужно
+    переписывать при каждом пересчёте.
+    """
+    return weight * math.exp(
+        decay_rate() * (created_at - epoch).total_seconds()
+    )
+
+
+def event_querysets(model, in_cart, since, horizon):
+    """
+    События, которые нужно добавить к рейтингу и вычесть из него, чтобы
+    он соответствовал состоянию на horizon. Удалённое после horizon
+    событие на тот момент ещё было: оно считается сейчас и вычитается
+    пересчётом, до окна которого дойдёт удаление.
+    """
+    events = model.objects.order_by().filter(created_at__lte=horizon)
+    deletions = PopularityDeletion.objects.filter(in_cart=in_cart)
+    removed_later = deletions.filter(
+        deleted_at__gt=horizon, created_at__lte=horizon
+    )
+    if since is None:
+        return (events, removed_later), ()
+    return (
+        (
+            events.filter(created_at__gt=since),
+            removed_later.filter(created_at__gt=since),
+        ),
+        (
+            deletions.filter(
+                deleted_at__gt=since,
+                deleted_at__lte=horizon,
+                created_at__lte=since,
+            ),
+        ),
+    )
+
+
+def collect_events(state, full, horizon):
+    """
+    Прирост счётчиков и trending по рецептам от отметки до horizon,
+    включая вычитание удалённых событий. Отметка — время события, а не
+    id: id выдаётся до коммита, и транзакция с меньшим id может
+    зафиксироваться позже следующего пересчёта.
+    """
+    deltas = defaultdict(lambda: [0, 0, 0.0])
+    since = None if full else state.events_until
+    for model, in_cart, weight, index in EVENTS:
+        added, removed = event_querysets(model, in_cart, since, horizon)
+        for querysets, sign in ((added, 1), (removed, -1)):
+            for queryset in querysets:
+                for recipe_id, created_at in queryset.values_list(
+                    'recipe_id', 'created_at'
+                ).iterator():
+                    delta = deltas[recipe_id]
+                    delta[index] += sign
+                    delta[2] += sign * event_weight(
+                        weight, created_at, state.epoch
+                    )
+    return deltas
+
+
+def rebase_epoch(state, now):
+    """
+    Переносит эпоху trending на now, умножая накопленные суммы на
+    затухание за прошедшее время, чтобы веса не переполнялись между
+    полными пересчётами.
+    """
+    age = decay_rate() * (now - state.epoch).total_seconds()
+    if age < REBASE_HALF_LIVES * math.log(2):
+        return
+    RecipePopularity.objects.update(trending=F('trending') * math.exp(-age))
+    state.epoch = now
+
+
+def apply_deltas(deltas):
+    """Добавляет прирост к строкам рейтинга затронутых рецептов."""
+    rows = RecipePopularity.objects.in_bulk(list(deltas))
+    missing = RecipePopularity.objects.bulk_create(
+        RecipePopularity(recipe_id=recipe_id)
+        for recipe_id in Recipe.objects.filter(
+            pk__in=set(deltas) - set(rows)
+        ).values_list('pk', flat=True)
+    )
+    rows.update((row.recipe_id, row) for row in missing)
+    for recipe_id, row in rows.items():
+        favorites, carts, trending = deltas[recipe_id]
+        row.favorites_count += favorites
+        row.carts_count += carts
+        row.trending += trending
+        row.score = (
+            row.favorites_count * FAVORITE_WEIGHT
+            + row.carts_count * CART_WEIGHT
+        )
+    RecipePopularity.objects.bulk_update(
+        rows.values(),
+        ('favorites_count', 'carts_count', 'score', 'trending'),
+        batch_size=BATCH_SIZE,
+    )
+
+
+@transaction.atomic
+def refresh_popularity(full=False):
+    """
+    Пересчитывает рейтинг. Обычный режим учитывает только события
+    после сохранённой отметки и трогает только затронутые рецепты.
+    Удаления вычитаются по журналу PopularityDeletion. Полный режим
+    считает всё заново от новой эпохи.
+    События последних RECIPE_CHANGES_LAG секунд откладываются до
+    следующего пересчёта, как в ленте изменений: их транзакции могут
+    быть ещё не зафиксированы.
+    """
+    now = timezone.now()
+    horizon = now - timedelta(seconds=settings.RECIPE_CHANGES_LAG)
+    state = PopularityState.objects.select_for_update().first()
+    if state is None:
+        state = PopularityState.objects.create(epoch=now)
+        full = True
+    if state.events_until is None:
+        full = True
+    if full:
+        state.epoch = now
+        RecipePopularity.objects.bulk_create(
+            (
+                RecipePopularity(recipe_id=recipe_id)
+                for recipe_id in Recipe.objects.filter(
+                    popularity__isnull=True
+                ).values_list('pk', flat=True)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        RecipePopularity.objects.update(
+            favorites_count=0, carts_count=0, score=0, trending=0
+        )
+    else:
+        rebase_epoch(state, now)
+    deltas = collect_events(state, full, horizon)
+    apply_deltas(deltas)
+    PopularityDeletion.objects.filter(deleted_at__lte=horizon).delete()
+    state.events_until = horizon
+    state.refreshed_at = now
+    state.save()
+    return len(deltas)
+
+
+def order_by_popularity(queryset, ordering):
+    """Сортировка ?ordering=popular|trending по индексам рейтинга."""
+    if ordering not in ORDERINGS:
+        return queryset
+    return queryset.filter(popularity__isnull=False).order_by(
+        *ORDERINGS[ordering]
+    )
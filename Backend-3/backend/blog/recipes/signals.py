@@ -0,0 +1,169 @@
+import threading
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes import timeline
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    PopularityDeletion,
+    Recipe,
+    RecipeDeletion,
+    RecipeIngredient,
+    RecipePopularity,
+    ShoppingCart,
+    Tag,
+)
+from users.models import Subscription, User
+
+# Поля автора, которые выводятся в карточке рецепта.
+AUTHOR_CARD_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name')
+)
+
+
+def touch_recipes(queryset):
+    """
+    Сдвигает updated_at рецептов, ответ API по которым изменился.
+    update() не вызывает сигналов модели Recipe.
+    """
+    queryset.update(updated_at=timezone.now())
+
+
+_pending = threading.local()
+
+
+def collect_on_commit(callback, items, order=0):
+    """
+    Копит items до коммита транзакции и вызывает callback один раз со
+    всем набором: пачечные операции шлют сигнал на каждую строку.
+    Наборы выполняются одним хуком on_commit по возрастанию order.
+    Они привязаны к списку on_commit соединения, который Django
+    заменяет при коммите и откате. Вне транзакции callback вызывается
+    сразу.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        callback(set(items))
+        return
+    if getattr(_pending, 'hooks', None) is not connection.run_on_commit:
+        batches = _pending.batches = {}
+        _pending.hooks = connection.run_on_commit
+        transaction.on_commit(lambda: run_batches(batches))
+    _pending.batches.setdefault((order, callback), set()).update(items)
+
+
+def run_batches(batches):
+    for order, callback in sorted(batches, key=lambda key: key[0]):
+        callback(batches[order, callback])
+
+
+def touch_recipe_ids(recipe_ids):
+    touch_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def touch_recipe_ingredients(sender, instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(pk=instance.recipe_id))
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def touch_deleted_recipe_ingredients(sender, instance, **kwargs):
+    # Рецепты транзакции сдвигаются одним UPDATE после коммита.
+    collect_on_commit(touch_recipe_ids, (instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipe_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        touch_recipes(Recipe.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_recipes(Recipe.objects.filter(pk__in=pk_set))
+    else:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(sender, instance, **kwargs):
+    # Связи с удаляемым тегом стираются каскадом без m2m_changed.
+    if not kwargs.get('created'):
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(
+            Recipe.objects.filter(recipeingredients__ingredient=instance)
+        )
+
+
+def changes_author_card(created, update_fields):
+    """
+    У нового пользователя ещё нет рецептов, а сохранение с update_fields
+    без полей автора (вход, смена пароля) карточки не меняет.
+    """
+    if created:
+        return False
+    return update_fields is None or bool(AUTHOR_CARD_FIELDS & update_fields)
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields,
+                         **kwargs):
+    if changes_author_card(created, update_fields):
+        touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_deletion(sender, instance, **kwargs):
+    RecipeDeletion.objects.create(recipe_id=instance.pk)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def log_popularity_deletion(sender, instance, **kwargs):
+    PopularityDeletion.objects.create(
+        recipe_id=instance.recipe_id,
+        in_cart=sender is ShoppingCart,
+        created_at=instance.created_at,
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: timeline.fan_out(instance))
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_popularity(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        RecipePopularity.objects.get_or_create(recipe=instance)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.update_celebrity(instance.author_id)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_timeline(sender, instance, **kwargs):
+    timeline.remove(instance.user_id, instance.author_id)
+    if timeline.update_celebrity(instance.author_id):
+        # После коммита: при удалении автора его рецептов уже не будет.
+        collect_on_commit(timeline.catch_up_followers, [instance.author_id])
@@ -0,0 +1,255 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from recipes.models import (
+    Recipe,
+    RecipeBucket,
+    RecipeIngredient,
+    RecipeSignature,
+    SimilarRecipe,
+)
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# Корзины больше этого размера почти ничего не говорят о сходстве
+# (соль, вода, сахар), но дают квадратичное число кандидатов.
+MAX_BUCKET_SIZE = 200
+PRIME = (1 << 31) - 1
+SEED = 20230614
+CHUNK_SIZE = 100000
+BATCH_SIZE = 5000
+
+_random = np.random.RandomState(SEED)
+HASH_A = _random.randint(1, PRIME, size=NUM_PERM).astype(np.int64)
+HASH_B = _random.randint(0, PRIME, size=NUM_PERM).astype(np.int64)
+BAND_MULTIPLIERS = _random.randint(
+    1, PRIME, size=ROWS
+).astype(np.uint64) | np.uint64(1)
+
+
+def load_matrix(recipe_ids=None):
+    """
+    Матрица рецепт × ингредиент в CSR-виде: отсортированные id
+    рецептов, границы их строк и id ингредиентов.
+    """
+    rows = RecipeIngredient.objects.order_by('recipe_id', 'ingredient_id')
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    pairs = np.array(
+        rows.values_list('recipe_id', 'ingredient_id'), dtype=np.int64
+    ).reshape(-1, 2)
+    recipes, starts = np.unique(pairs[:, 0], return_index=True)
+    indptr = np.append(starts, len(pairs))
+    return recipes, indptr, pairs[:, 1]
+
+
+def compute_signatures(indptr, ingredients):
+    """
+    MinHash по NUM_PERM хеш-функциям (a·x + b) mod p: минимум хешей по
+    ингредиентам каждой строки. Считается кусками, чтобы матрица хешей
+    не превышала NUM_PERM × CHUNK_SIZE.
+    """
+    signatures = np.empty((len(indptr) - 1, NUM_PERM), dtype=np.uint32)
+    start = 0
+    while start < len(indptr) - 1:
+        stop = int(np.searchsorted(
+            indptr, indptr[start] + CHUNK_SIZE, side='right'
+        ))
+        stop = min(max(stop - 1, start + 1), len(indptr) - 1)
+        chunk = ingredients[indptr[start]:indptr[stop]]
+        hashes = (HASH_A[:, None] * chunk[None, :] + HASH_B[:, None]) % PRIME
+        signatures[start:stop] = np.minimum.reduceat(
+            hashes, indptr[start:stop] - indptr[start], axis=1
+        ).T
+        start = stop
+    return signatures
+
+
+def band_keys(signatures):
+    """Ключи LSH-корзин: хеш ROWS значений сигнатуры в каждой полосе."""
+    bands = signatures.reshape(len(signatures), BANDS, ROWS).astype(
+        np.uint64
+    )
+    return (bands * BAND_MULTIPLIERS).sum(axis=2).view(np.int64)
+
+
+def top_neighbours(signature, candidate_ids, candidate_signatures, count):
+    """
+    Доля совпавших позиций MinHash оценивает сходство Жаккара;
+    возвращает count лучших кандидатов с оценками.
+    """
+    scores = (candidate_signatures == signature).mean(axis=1)
+    if len(scores) > count:
+        best = np.argpartition(-scores, count)[:count]
+    else:
+        best = np.arange(len(scores))
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return [
+        (int(candidate_ids[i]), float(scores[i]))
+        for i in best if scores[i] > 0
+    ]
+
+
+def save_signatures(recipe_ids, signatures, keys, built_at):
+    RecipeSignature.objects.bulk_create(
+        (
+            RecipeSignature(
+                recipe_id=int(recipe_id),
+                minhash=signature.tobytes(),
+                built_at=built_at,
+            )
+            for recipe_id, signature in zip(recipe_ids, signatures)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    RecipeBucket.objects.bulk_create(
+        (
+            RecipeBucket(recipe_id=int(recipe_id), band=band, bucket=int(key))
+            for recipe_id, row in zip(recipe_ids, keys)
+            for band, key in enumerate(row)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def save_neighbours(neighbours):
+    SimilarRecipe.objects.filter(recipe_id__in=list(neighbours)).delete()
+    SimilarRecipe.objects.bulk_create(
+        (
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar, score=score)
+            for recipe_id, items in neighbours.items()
+            for similar, score in items
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def candidates_from_keys(recipe_ids, keys):
+    """Кандидаты для всех рецептов по корзинам, собранным в памяти."""
+    candidates = defaultdict(set)
+    for band in range(BANDS):
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        for group in np.split(order, bounds):
+            if 1 < len(group) <= MAX_BUCKET_SIZE:
+                for index in group:
+                    candidates[index].update(group)
+    return candidates
+
+
+@transaction.atomic
+def build_full():
+    """Строит сигнатуры, корзины и соседей для всех рецептов заново."""
+    built_at = timezone.now()
+    recipe_ids, indptr, ingredients = load_matrix()
+    signatures = compute_signatures(indptr, ingredients)
+    keys = band_keys(signatures)
+    RecipeSignature.objects.all().delete()
+    RecipeBucket.objects.all().delete()
+    SimilarRecipe.objects.all().delete()
+    save_signatures(recipe_ids, signatures, keys, built_at)
+    neighbours = {}
+    for index, candidates in candidates_from_keys(recipe_ids, keys).items():
+        candidates.discard(index)
+        candidates = np.fromiter(candidates, dtype=np.int64)
+        neighbours[int(recipe_ids[index])] = top_neighbours(
+            signatures[index], recipe_ids[candidates],
+            signatures[candidates], settings.SIMILAR_RECIPES_COUNT,
+        )
+    save_neighbours(neighbours)
+    return len(recipe_ids)
+
+
+def candidates_from_db(recipe_ids):
+    """Кандидаты по сохранённым корзинам для указанных рецептов."""
+    own = defaultdict(set)
+    for recipe_id, band, bucket in RecipeBucket.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'band', 'bucket'):
+        own[(band, bucket)].add(recipe_id)
+    members = defaultdict(set)
+    by_band = defaultdict(list)
+    for band, bucket in own:
+        by_band[band].append(bucket)
+    # Все полосы одним запросом: по запросу на полосу выходит BANDS штук.
+    lookup = Q()
+    for band, buckets in by_band.items():
+        lookup |= Q(band=band, bucket__in=buckets)
+    if by_band:
+        for recipe_id, band, bucket in RecipeBucket.objects.filter(
+            lookup
+        ).values_list('recipe_id', 'band', 'bucket'):
+            members[(band, bucket)].add(recipe_id)
+    candidates = defaultdict(set)
+    for key, recipes in own.items():
+        if len(members[key]) <= MAX_BUCKET_SIZE:
+            for recipe_id in recipes:
+                candidates[recipe_id].update(members[key] - {recipe_id})
+    return candidates
+
+
+def load_signatures(recipe_ids):
+    return {
+        recipe_id: np.frombuffer(minhash, dtype=np.uint32)
+        for recipe_id, minhash in RecipeSignature.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'minhash')
+    }
+
+
+@transaction.atomic
+def build_incremental():
+    """
+    Пересчитывает только рецепты, изменённые после своей сигнатуры,
+    и пересобирает соседей у них, у их новых кандидатов и у тех, в
+    чьих списках они уже были.
+    """
+    built_at = timezone.now()
+    changed = list(Recipe.objects.filter(
+        Q(signature__isnull=True)
+        | Q(signature__built_at__lt=F('updated_at'))
+    ).values_list('pk', flat=True))
+    if not changed:
+        return 0
+    recipe_ids, indptr, ingredients = load_matrix(changed)
+    signatures = compute_signatures(indptr, ingredients)
+    RecipeSignature.objects.filter(recipe_id__in=changed).delete()
+    RecipeBucket.objects.filter(recipe_id__in=changed).delete()
+    save_signatures(recipe_ids, signatures, band_keys(signatures), built_at)
+
+    candidates = candidates_from_db(changed)
+    affected = set(changed)
+    for items in list(candidates.values()):
+        affected.update(items)
+    affected.update(SimilarRecipe.objects.filter(
+        similar_id__in=changed
+    ).values_list('recipe_id', flat=True))
+    candidates.update(candidates_from_db(affected - set(changed)))
+
+    involved = set(affected)
+    for items in candidates.values():
+        involved.update(items)
+    signature_map = load_signatures(involved)
+    neighbours = {}
+    for recipe_id in affected:
+        if recipe_id not in signature_map:
+            neighbours[recipe_id] = []
+            continue
+        ids = np.array(
+            [i for i in candidates.get(recipe_id, ()) if i in signature_map],
+            dtype=np.int64,
+        )
+        neighbours[recipe_id] = top_neighbours(
+            signature_map[recipe_id], ids,
+            np.array([signature_map[i] for i in ids]).reshape(-1, NUM_PERM),
+            settings.SIMILAR_RECIPES_COUNT,
+        )
+    save_neighbours(neighbours)
+    return len(changed)
@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import CelebrityAuthor, Recipe, TimelineEntry
+from users.models import Subscription
+
+CELEBRITIES_KEY = 'feed:celebrities'
+BATCH_SIZE = 1000
+
+
+def get_celebrity_ids():
+    """
+    Авторы, у которых подписчиков больше FEED_FANOUT_LIMIT. Их рецепты
+    не раскладываются по лентам, а подмешиваются при чтении.
+    """
+    celebrities = cache.get(CELEBRITIES_KEY)
+    if celebrities is None:
+        celebrities = frozenset(
+            CelebrityAuthor.objects.values_list('author_id', flat=True)
+        )
+        cache.set(
+            CELEBRITIES_KEY, celebrities,
+            settings.FEED_CELEBRITY_CACHE_TIMEOUT
+        )
+    return celebrities
+
+
+def is_celebrity(author_id):
+    """
+    Решение о раскладке принимается по БД, а не по кэшу: иначе процесс
+    с устаревшим списком пропустит рецепт, который никто не подмешает.
+    """
+    return CelebrityAuthor.objects.filter(author_id=author_id).exists()
+
+
+def update_celebrity(author_id):
+    """
+    Отмечает переход автора через FEED_FANOUT_LIMIT. Возвращает True,
+    если автор опустился до порога: тогда ленты подписчиков должны
+    догнать его рецепты (catch_up_followers).
+    """
+    followers = Subscription.objects.filter(author_id=author_id).count()
+    if followers > settings.FEED_FANOUT_LIMIT:
+        _, changed = CelebrityAuthor.objects.get_or_create(
+            author_id=author_id
+        )
+        dropped = False
+    else:
+        changed, _ = CelebrityAuthor.objects.filter(
+            author_id=author_id
+        ).delete()
+        dropped = bool(changed)
+    if changed:
+        cache.delete(CELEBRITIES_KEY)
+    return dropped
+
+
+def catch_up_followers(author_ids):
+    """
+    Записывает в ленты всех подписчиков последние рецепты авторов,
+    переставших быть знаменитостями: пока они ими были, ни публикации,
+    ни новые подписки в ленты не попадали.
+    """
+    for author_id in author_ids:
+        if not is_celebrity(author_id):
+            catch_up(
+                Subscription.objects.filter(
+                    author_id=author_id
+                ).values_list('user_id', flat=True),
+                author_id,
+            )
+
+
+def fan_out(recipe):
+    """Записывает новый рецепт в ленты подписчиков автора."""
+    if is_celebrity(recipe.author_id):
+        return
+    followers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                author_id=recipe.author_id,
+                recipe_id=recipe.pk,
+                pub_date=recipe.pub_date,
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id, size=None):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if not is_celebrity(author_id):
+        catch_up([user_id], author_id, size)
+
+
+def catch_up(user_ids, author_id, size=None):
+    """Записывает последние рецепты автора в ленты пользователей."""
+    recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:size or settings.FEED_BACKFILL_SIZE])
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                author_id=author_id,
+                recipe_id=recipe_id,
+                pub_date=pub_date,
+            )
+            for user_id in user_ids
+            for recipe_id, pub_date in recipes
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove(user_id, author_id):
+    """Убирает рецепты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
@@ -0,0 +1,94 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.nplusone import detect_n_plus_one
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """
+    Тело каждого теста (без фикстур) проверяется на N+1, найденная
+    проблема роняет тест. Маркер allow_n_plus_one отключает проверку.
+    """
+    if item.get_closest_marker('allow_n_plus_one'):
+        yield
+        return
+    with detect_n_plus_one(raise_error=True):
+        yield
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='cook', email='cook@example.com', password='password',
+        first_name='Иван', last_name='Петров',
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@example.com', password='password',
+        first_name='Анна', last_name='Смирнова',
+    )
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+            ('Ужин', '#8775D2', 'dinner'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=name, measurement_unit=unit)
+        for name, unit in (
+            ('мука', 'г'), ('молоко', 'мл'), ('яйца', 'шт'), ('соль', 'г'),
+        )
+    ]
+
+
+def create_recipe(author, name, tags=(), ingredients=(),
+                  image='recipes/1.png'):
+    recipe = Recipe.objects.create(
+        author=author, name=name, text='Описание', image=image,
+        cooking_time=15,
+    )
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for amount, ingredient in enumerate(ingredients, start=10)
+    )
+    return recipe
+
+
+@pytest.fixture
+def recipes(author, user, tags, ingredients):
+    return [
+        create_recipe(author, 'Блины', tags[:2], ingredients[:3]),
+        create_recipe(author, 'Омлет', tags[:1], ingredients[1:3]),
+        create_recipe(user, 'Хлеб', (), ingredients[::3], image=''),
+    ]
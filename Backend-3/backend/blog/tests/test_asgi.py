@@ -0,0 +1,73 @@
+import importlib
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, override_settings
+from django.urls import clear_url_caches
+
+from api.middleware import StatementTimeout
+
+
+def reload_urls():
+    import api.urls
+    import blog.urls
+
+    importlib.reload(api.urls)
+    importlib.reload(blog.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def asgi_client():
+    """
+    Клиент через ASGIHandler с асинхронными горячими чтениями:
+    роутер оборачивает их в blog.urls только при ASYNC_READ_VIEWS.
+    """
+    with override_settings(QUERY_TIMING_ENABLED=True, ASYNC_READ_VIEWS=True):
+        reload_urls()
+        yield AsyncClient()
+    reload_urls()
+
+
+def db_queries(client, path):
+    response = async_to_sync(client.get)(path)
+    assert response.status_code == 200
+    return int(response['X-DB-Queries'])
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('path', (
+    # async_read_actions: вьюха выполняется в пуле потоков.
+    '/api/recipes/',
+    # Обычная синхронная вьюха в общем потоке синхронного кода.
+    '/api/users/',
+))
+def test_asgi_counts_queries(asgi_client, recipes, path):
+    assert db_queries(asgi_client, path) > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_executor_path_gets_request_wrappers(
+    asgi_client, settings, monkeypatch, recipes
+):
+    # Middleware AsyncClient собирает при первом запросе.
+    settings.STATEMENT_TIMEOUT_ENABLED = True
+    calls = []
+    apply_timeout = StatementTimeout.__call__
+
+    def spy(self, execute, sql, params, many, context):
+        calls.append((threading.current_thread().name, self.milliseconds))
+        return apply_timeout(self, execute, sql, params, many, context)
+
+    monkeypatch.setattr(StatementTimeout, '__call__', spy)
+    response = async_to_sync(asgi_client.get)('/api/recipes/')
+
+    assert response.status_code == 200
+    assert 'db;dur=' in response['Server-Timing']
+    assert int(response['X-DB-Queries']) == len(calls) > 0
+    budget = settings.STATEMENT_TIMEOUTS['anonymous_list']
+    assert {
+        (thread.startswith('async-read'), milliseconds)
+        for thread, milliseconds in calls
+    } == {(True, budget)}
@@ -0,0 +1,13 @@
+import pytest
+
+from api.authentication import check_not_revoked, deny_token, issue_tokens
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+
+@pytest.mark.django_db
+def test_refresh_token_is_denied_once(user):
+    refresh = issue_tokens(user)
+    assert deny_token(refresh)
+    assert not deny_token(refresh)
+    with pytest.raises(InvalidToken):
+        check_not_revoked(refresh)
@@ -0,0 +1,40 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from api.cache import check_shared_cache, shared_cache_features
+
+
+@pytest.mark.parametrize('setting, feature', (
+    ('API_CACHE_ENABLED', 'API_CACHE'),
+    ('RECIPE_CARD_CACHE_ENABLED', 'RECIPE_CARD_CACHE'),
+    ('JWT_AUTH_ENABLED', 'JWT_AUTH'),
+))
+def test_local_cache_is_rejected(settings, setting, feature):
+    setattr(settings, setting, True)
+    assert feature in shared_cache_features()
+    with pytest.raises(ImproperlyConfigured, match=feature):
+        check_shared_cache(shared_cache_features())
+
+
+def test_replicas_require_shared_cache(settings):
+    settings.DATABASE_REPLICAS = ['replica_0']
+    with pytest.raises(ImproperlyConfigured, match='DB_REPLICA_HOSTS'):
+        check_shared_cache(shared_cache_features())
+
+
+def test_local_cache_without_shared_state(settings):
+    check_shared_cache(shared_cache_features())
+
+
+def test_jwt_requires_atomic_cache(settings, tmp_path):
+    settings.JWT_AUTH_ENABLED = True
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }}
+    with pytest.raises(ImproperlyConfigured, match='JWT_AUTH'):
+        check_shared_cache(shared_cache_features())
+
+    settings.JWT_AUTH_ENABLED = False
+    settings.API_CACHE_ENABLED = True
+    check_shared_cache(shared_cache_features())
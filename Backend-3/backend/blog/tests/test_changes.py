@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeDeletion
+
+CHANGES_URL = '/api/recipes/changes/'
+
+
+def settle(recipes):
+    """Записи старше окна RECIPE_CHANGES_LAG, в порядке списка."""
+    started = timezone.now() - timedelta(minutes=1)
+    for number, recipe in enumerate(recipes):
+        Recipe.objects.filter(pk=recipe.pk).update(
+            updated_at=started + timedelta(seconds=number)
+        )
+
+
+def sync(client, since=None, limit=None):
+    params = {}
+    if since is not None:
+        params['since'] = since
+    if limit is not None:
+        params['limit'] = limit
+    response = client.get(CHANGES_URL, params)
+    assert response.status_code == 200
+    return response.data
+
+
+@pytest.mark.django_db
+def test_cursor_continues_where_it_stopped(client, recipes):
+    settle(recipes)
+    seen = []
+    since = None
+    while True:
+        page = sync(client, since, limit=1)
+        seen += [recipe['id'] for recipe in page['results']]
+        since = page['next']
+        if not page['has_more']:
+            break
+    assert seen == [recipe.pk for recipe in recipes]
+    assert sync(client, since)['results'] == []
+
+    recipes[1].name = 'Блины с творогом'
+    recipes[1].save()
+    Recipe.objects.filter(pk=recipes[1].pk).update(
+        updated_at=timezone.now() - timedelta(seconds=5)
+    )
+    page = sync(client, since)
+    assert [recipe['id'] for recipe in page['results']] == [recipes[1].pk]
+
+
+@pytest.mark.django_db
+def test_deletions_follow_changes(client, recipes):
+    settle(recipes)
+    since = sync(client)['next']
+    deleted_id = recipes[0].pk
+    recipes[0].delete()
+    RecipeDeletion.objects.update(
+        deleted_at=timezone.now() - timedelta(seconds=5)
+    )
+    page = sync(client, since)
+    assert page['deleted'] == [deleted_id]
+    assert page['results'] == []
+
+
+@pytest.mark.django_db
+def test_recent_changes_wait_for_lag(settings, client, recipes):
+    settle(recipes)
+    since = sync(client)['next']
+    recent = timezone.now() - timedelta(
+        seconds=settings.RECIPE_CHANGES_LAG / 2
+    )
+    Recipe.objects.filter(pk=recipes[2].pk).update(updated_at=recent)
+    page = sync(client, since)
+    assert page['results'] == []
+    assert page['next'] == since
+
+    # Запись выходит за окно и попадает в ленту после прежнего курсора.
+    Recipe.objects.filter(pk=recipes[2].pk).update(
+        updated_at=recent - timedelta(seconds=settings.RECIPE_CHANGES_LAG)
+    )
+    page = sync(client, since)
+    assert [recipe['id'] for recipe in page['results']] == [recipes[2].pk]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor(client):
+    response = client.get(CHANGES_URL, {'since': 'not-a-cursor'})
+    assert response.status_code == 400
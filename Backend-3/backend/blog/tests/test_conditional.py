@@ -0,0 +1,124 @@
+from collections import Counter
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from recipes.models import Recipe
+
+RECIPES_URL = '/api/recipes/'
+
+
+@pytest.fixture
+def api_cache(settings):
+    settings.API_CACHE_ENABLED = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def aggregate_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'MAX(' in query['sql'].upper()
+    ]
+
+
+@pytest.mark.django_db
+def test_list_not_modified(client, recipes):
+    response = client.get(RECIPES_URL)
+    assert response.status_code == 200
+    etag = response['ETag']
+
+    response = client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+@pytest.mark.django_db
+def test_list_etag_follows_updates(client, recipes):
+    etag = client.get(RECIPES_URL)['ETag']
+    Recipe.objects.filter(pk=recipes[0].pk).update(
+        updated_at=timezone.now() + timedelta(seconds=1)
+    )
+    response = client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_detail_not_modified(user_client, recipes):
+    url = f'{RECIPES_URL}{recipes[0].pk}/'
+    etag = user_client.get(url)['ETag']
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_unconditional_list_runs_one_aggregate(client, recipes):
+    with CaptureQueriesContext(connection) as context:
+        client.get(RECIPES_URL)
+    assert len(aggregate_queries(context)) == 1
+
+
+@pytest.mark.django_db
+def test_anonymous_cache_hit_skips_database(client, recipes, api_cache):
+    etag = client.get(RECIPES_URL)['ETag']
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(RECIPES_URL)
+        conditional = client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] == etag
+    assert conditional.status_code == 304
+    assert context.captured_queries == []
+
+
+@pytest.mark.django_db
+def test_combined_filters_evaluated_once(user_client, author, recipes, tags):
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(RECIPES_URL, {
+            'tags': [tags[0].slug, tags[1].slug],
+            'author': author.pk,
+            'is_favorited': 0,
+        })
+    assert response.status_code == 200
+    repeated = [
+        sql for sql, count in Counter(
+            query['sql'] for query in context.captured_queries
+        ).items() if count > 1
+    ]
+    assert repeated == []
+
+
+@pytest.mark.django_db
+def test_last_modified_waits_for_second_to_pass(client, recipes):
+    url = f'{RECIPES_URL}{recipes[0].pk}/'
+    # Секунда правки ещё не прошла, как бы ни выпал запрос на границу.
+    Recipe.objects.filter(pk=recipes[0].pk).update(
+        updated_at=timezone.now() + timedelta(seconds=1)
+    )
+    assert 'Last-Modified' not in client.get(url)
+
+    Recipe.objects.filter(pk=recipes[0].pk).update(
+        updated_at=timezone.now() - timedelta(seconds=2)
+    )
+    response = client.get(url)
+    assert 'Last-Modified' in response
+    response = client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deleted_ingredients_touch_recipe_once(recipes):
+    with CaptureQueriesContext(connection) as context:
+        recipes[0].recipeingredients.all().delete()
+    updates = [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('UPDATE "recipes_recipe"')
+    ]
+    assert len(updates) == 1
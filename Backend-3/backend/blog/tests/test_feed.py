@@ -0,0 +1,93 @@
+import pytest
+from django.core.cache import cache
+
+from recipes.models import CelebrityAuthor, TimelineEntry
+from tests.conftest import create_recipe
+from users.models import Subscription
+
+FEED_URL = '/api/recipes/feed/'
+
+
+@pytest.fixture
+def fanout_limit(settings):
+    settings.FEED_FANOUT_LIMIT = 1
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def fan(django_user_model):
+    return django_user_model.objects.create_user(
+        username='fan', email='fan@example.com', password='password',
+    )
+
+
+def feed_names(client):
+    response = client.get(FEED_URL)
+    assert response.status_code == 200
+    return [recipe['name'] for recipe in response.data['results']]
+
+
+def publish(author, name, capture):
+    with capture(execute=True):
+        return create_recipe(author, name)
+
+
+@pytest.mark.django_db
+def test_recipe_fans_out_to_followers(
+    user_client, user, author, django_capture_on_commit_callbacks
+):
+    Subscription.objects.create(user=user, author=author)
+    recipe = publish(author, 'Блины', django_capture_on_commit_callbacks)
+
+    assert TimelineEntry.objects.filter(user=user, recipe=recipe).exists()
+    assert feed_names(user_client) == ['Блины']
+
+
+@pytest.mark.django_db
+def test_subscription_backfills_and_unsubscribe_clears(
+    user_client, user, author, django_capture_on_commit_callbacks
+):
+    publish(author, 'Блины', django_capture_on_commit_callbacks)
+    publish(author, 'Омлет', django_capture_on_commit_callbacks)
+    subscription = Subscription.objects.create(user=user, author=author)
+    assert feed_names(user_client) == ['Омлет', 'Блины']
+
+    subscription.delete()
+    assert not TimelineEntry.objects.filter(user=user).exists()
+    assert feed_names(user_client) == []
+
+
+@pytest.mark.django_db
+def test_celebrity_recipes_merged_on_read(
+    user_client, user, author, fan, fanout_limit,
+    django_capture_on_commit_callbacks
+):
+    Subscription.objects.create(user=user, author=author)
+    publish(author, 'Блины', django_capture_on_commit_callbacks)
+    Subscription.objects.create(user=fan, author=author)
+    assert CelebrityAuthor.objects.filter(author=author).exists()
+
+    publish(author, 'Омлет', django_capture_on_commit_callbacks)
+    assert not TimelineEntry.objects.filter(recipe__name='Омлет').exists()
+    assert feed_names(user_client) == ['Омлет', 'Блины']
+
+
+@pytest.mark.django_db
+def test_feed_catches_up_when_author_drops_below_limit(
+    user_client, user, author, fan, fanout_limit,
+    django_capture_on_commit_callbacks
+):
+    Subscription.objects.create(user=user, author=author)
+    Subscription.objects.create(user=fan, author=author)
+    publish(author, 'Блины', django_capture_on_commit_callbacks)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Subscription.objects.filter(user=fan).delete()
+
+    assert not CelebrityAuthor.objects.filter(author=author).exists()
+    assert TimelineEntry.objects.filter(
+        user=user, recipe__name='Блины'
+    ).exists()
+    assert feed_names(user_client) == ['Блины']
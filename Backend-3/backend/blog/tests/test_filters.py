@@ -0,0 +1,57 @@
+import re
+from collections import Counter
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, ShoppingCart
+
+RECIPES_URL = '/api/recipes/'
+
+
+def recipe_list_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "recipes_recipe"' in query['sql']
+    ]
+
+
+def joined_tables(sql):
+    return Counter(re.findall(r'JOIN "(\w+)"', sql))
+
+
+@pytest.mark.django_db
+def test_combined_filters_do_not_duplicate_joins(
+    user, user_client, author, recipes, tags
+):
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get(RECIPES_URL, {
+            'tags': [tags[0].slug, tags[1].slug],
+            'author': author.pk,
+            'is_favorited': 1,
+            'is_in_shopping_cart': 1,
+        })
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        recipes[0].pk
+    ]
+    queries = recipe_list_queries(context)
+    assert queries
+    for sql in queries:
+        assert 'DISTINCT' not in sql
+        assert all(
+            count == 1 for count in joined_tables(sql).values()
+        ), sql
+
+
+@pytest.mark.django_db
+def test_tag_filter_returns_each_recipe_once(client, recipes, tags):
+    response = client.get(RECIPES_URL, {
+        'tags': [tag.slug for tag in tags],
+    })
+    ids = [recipe['id'] for recipe in response.data['results']]
+    assert sorted(ids) == sorted({recipes[0].pk, recipes[1].pk})
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import RecipeCard, Tag
+
+RECIPES_URL = '/api/recipes/'
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+@pytest.fixture
+def projection(settings):
+    settings.RECIPE_CARD_PROJECTION_ENABLED = True
+
+
+def card(recipe):
+    return json.loads(RecipeCard.objects.get(recipe=recipe).data)
+
+
+def projection_writes(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'recipes_recipecard' in query['sql']
+        and not query['sql'].startswith('SELECT')
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_maintain_projection(projection, recipes, tags):
+    tags[0].name = 'Завтрак дня'
+    tags[0].save()
+    assert card(recipes[0])['tags'][0]['name'] == 'Завтрак дня'
+    assert card(recipes[1])['tags'][0]['name'] == 'Завтрак дня'
+
+    recipes[0].recipeingredients.all().delete()
+    assert card(recipes[0])['ingredients'] == []
+    # Строка собрана после отложенного сдвига updated_at и актуальна.
+    recipes[0].refresh_from_db()
+    assert RecipeCard.objects.get(
+        recipe=recipes[0]
+    ).recipe_updated_at == recipes[0].updated_at
+
+    tags[1].delete()
+    assert [tag['id'] for tag in card(recipes[0])['tags']] == [tags[0].pk]
+    assert not Tag.objects.filter(pk=tags[1].pk).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_do_not_write_projection(projection, client, recipes):
+    RecipeCard.objects.all().delete()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(RECIPES_URL)
+        client.get(f'{RECIPES_URL}{recipes[0].pk}/')
+    assert response.status_code == 200
+    assert len(response.data['results']) == len(recipes)
+    assert projection_writes(context) == []
+    assert not RecipeCard.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_writes_rebuild_projection_with_ingredients(
+    projection, settings, tmp_path, user_client, tags, ingredients
+):
+    settings.MEDIA_ROOT = tmp_path
+    payload = {
+        'tags': [tags[0].pk],
+        'ingredients': [
+            {'id': ingredients[0].pk, 'amount': 100},
+            {'id': ingredients[1].pk, 'amount': 200},
+        ],
+        'name': 'Сырники',
+        'text': 'Описание',
+        'cooking_time': 20,
+        'image': IMAGE,
+    }
+    response = user_client.post(RECIPES_URL, payload, format='json')
+    assert response.status_code == 201
+    url = f'{RECIPES_URL}{response.data["id"]}/'
+    assert [item['id'] for item in card(response.data['id'])[
+        'ingredients'
+    ]] == [ingredients[0].pk, ingredients[1].pk]
+
+    payload['ingredients'] = [{'id': ingredients[2].pk, 'amount': 3}]
+    assert user_client.patch(
+        url, payload, format='json'
+    ).status_code == 200
+    assert [
+        item['id'] for item in user_client.get(url).data['ingredients']
+    ] == [ingredients[2].pk]
+    assert [item['id'] for item in card(response.data['id'])[
+        'ingredients'
+    ]] == [ingredients[2].pk]
@@ -0,0 +1,66 @@
+import pytest
+from django.db import connection
+
+from recipes.management.commands.explain_hot_paths import hot_paths
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Subscription, User
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='планы запросов проверяются на PostgreSQL',
+)
+
+USERS = 200
+RECIPES_PER_USER = 20
+INGREDIENTS_PER_RECIPE = 5
+
+
+@pytest.fixture
+def hot_path_data(transactional_db):
+    """
+    Объём, при котором планировщик с настройками по умолчанию
+    предпочитает индексы последовательному чтению.
+    """
+    users = User.objects.bulk_create(
+        User(username=f'user{number}', email=f'user{number}@example.com')
+        for number in range(USERS)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(100)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=user, name=f'{user.username} {number}', image='',
+            text='текст', cooking_time=10,
+        )
+        for user in users for number in range(RECIPES_PER_USER)
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[(recipe.pk + number) % len(ingredients)],
+            amount=number + 1,
+        )
+        for recipe in recipes for number in range(INGREDIENTS_PER_RECIPE)
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=user, recipe=recipes[(user.pk * 7) % len(recipes)])
+        for user in users
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=users[(user.pk + shift) % USERS])
+        for user in users for shift in (1, 2, 3)
+    )
+    with connection.cursor() as cursor:
+        for model in (
+            Recipe, RecipeIngredient, ShoppingCart, Subscription
+        ):
+            cursor.execute(f'VACUUM ANALYZE "{model._meta.db_table}"')
+    return users[0]
+
+
+def test_hot_paths_use_indexes(hot_path_data):
+    for title, queryset, index in hot_paths(hot_path_data.pk):
+        plan = queryset.explain()
+        assert index in plan, f'{title}:\n{plan}'
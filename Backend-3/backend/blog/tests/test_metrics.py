@@ -0,0 +1,37 @@
+import importlib
+
+import pytest
+from django.test import override_settings
+from django.urls import clear_url_caches
+from prometheus_client.parser import text_string_to_metric_families
+
+
+@pytest.fixture
+def metrics_urls():
+    """/metrics подключается в blog.urls только при METRICS_ENABLED."""
+    import blog.urls
+
+    with override_settings(METRICS_ENABLED=True):
+        importlib.reload(blog.urls)
+        clear_url_caches()
+        yield
+    importlib.reload(blog.urls)
+    clear_url_caches()
+
+
+@pytest.mark.django_db
+def test_metrics_contain_viewset_action_series(metrics_urls, client, tags):
+    assert client.get('/api/tags/').status_code == 200
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    labels = {'view': 'TagViewSet', 'action': 'list', 'method': 'GET'}
+    series = {
+        sample.name
+        for family in text_string_to_metric_families(response.content.decode())
+        for sample in family.samples
+        if sample.labels == labels
+    }
+    assert 'api_request_duration_seconds_count' in series
+    assert 'api_db_queries_count' in series
@@ -0,0 +1,28 @@
+import pytest
+
+from api.nplusone import NPlusOneError, detect_n_plus_one
+from recipes.models import Recipe
+from tests.conftest import create_recipe
+
+
+@pytest.mark.django_db
+@pytest.mark.allow_n_plus_one
+def test_detector_reports_repeated_queries(recipes):
+    with pytest.raises(NPlusOneError, match='recipes_recipe'):
+        with detect_n_plus_one(threshold=2):
+            for recipe in Recipe.objects.all():
+                Recipe.objects.get(pk=recipe.pk)
+
+
+@pytest.mark.django_db
+@pytest.mark.allow_n_plus_one
+def test_recipe_list_has_no_n_plus_one(
+    settings, client, author, tags, ingredients
+):
+    for number in range(settings.NPLUSONE_THRESHOLD + 1):
+        create_recipe(author, f'Рецепт {number}', tags, ingredients)
+    # Запрос на каждый рецепт страницы повторился бы больше одного раза.
+    with detect_n_plus_one(threshold=1):
+        response = client.get('/api/recipes/')
+    assert response.status_code == 200
+    assert len(response.data['results']) > settings.NPLUSONE_THRESHOLD
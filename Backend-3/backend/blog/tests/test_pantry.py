@@ -0,0 +1,47 @@
+import pytest
+
+from recipes.models import RecipeIngredient
+from recipes.pantry import IngredientIndex
+
+
+@pytest.fixture
+def index(settings):
+    settings.COOKABLE_REFRESH_INTERVAL = 0
+    return IngredientIndex()
+
+
+def ids(ingredients):
+    return [ingredient.pk for ingredient in ingredients]
+
+
+@pytest.mark.django_db
+def test_search_orders_by_missing(index, recipes, ingredients):
+    pancakes, omelette, bread = recipes
+    assert index.search(ids(ingredients[1:3]), max_missing=1) == [
+        (omelette.pk, 0), (pancakes.pk, 1),
+    ]
+    assert index.search(ids(ingredients[1:3]), max_missing=0) == [
+        (omelette.pk, 0),
+    ]
+    # При равной нехватке выше рецепт, где совпало больше ингредиентов.
+    assert index.search(ids(ingredients), max_missing=0) == [
+        (pancakes.pk, 0), (omelette.pk, 0), (bread.pk, 0),
+    ]
+
+
+@pytest.mark.django_db
+def test_refresh_after_update_and_delete(index, recipes, ingredients):
+    pancakes, omelette, _ = recipes
+    index.search(ids(ingredients[1:3]), max_missing=0)
+
+    RecipeIngredient.objects.create(
+        recipe=omelette, ingredient=ingredients[3], amount=1
+    )
+    assert index.search(ids(ingredients[1:3]), max_missing=1) == [
+        (pancakes.pk, 1), (omelette.pk, 1),
+    ]
+
+    omelette.delete()
+    assert index.search(ids(ingredients[1:3]), max_missing=1) == [
+        (pancakes.pk, 1),
+    ]
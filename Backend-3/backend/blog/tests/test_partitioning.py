@@ -0,0 +1,67 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from recipes.models import Favorite, ShoppingCart
+from recipes.partitioning import PARTITIONED_MODELS
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='секционирование доступно только в PostgreSQL',
+)
+
+PARTITIONS = 4
+
+
+def placements(model):
+    """
+    Секция каждой строки и то, принадлежит ли строка этой секции по
+    хешу user_id. Перенос и откат теста идут в одной транзакции.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT t.id, t.tableoid::regclass::text, '
+            f'satisfies_hash_partition(%s::regclass, %s, '
+            f'substring(t.tableoid::regclass::text FROM %s)::int, '
+            f't.user_id) '
+            f'FROM {table} t',
+            [table, PARTITIONS, r'_p(\d+)$'],
+        )
+        return {pk: (partition, fits) for pk, partition, fits in cursor}
+
+
+@pytest.mark.django_db
+def test_rows_land_in_hash_partitions(django_user_model, recipes):
+    users = [
+        django_user_model.objects.create_user(
+            username=f'user{number}', email=f'user{number}@example.com',
+        )
+        for number in range(8)
+    ]
+    for user in users:
+        Favorite.objects.create(user=user, recipe=recipes[0])
+        ShoppingCart.objects.create(user=user, recipe=recipes[1])
+
+    call_command(
+        'partition_user_tables', partitions=PARTITIONS, drop_old=True,
+        stdout=StringIO(),
+    )
+    Favorite.objects.create(user=users[0], recipe=recipes[1])
+
+    for model in PARTITIONED_MODELS:
+        rows = placements(model)
+        assert len(rows) == model.objects.count()
+        for partition, fits in rows.values():
+            assert partition.startswith(f'{model._meta.db_table}_p')
+            assert fits
+    # Строки одного пользователя лежат в одной секции.
+    favorites = placements(Favorite)
+    assert len({
+        favorites[pk][0]
+        for pk in Favorite.objects.filter(
+            user=users[0]
+        ).values_list('pk', flat=True)
+    }) == 1
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+import pytest
+from django.db.models import F
+
+from recipes.models import Favorite, PopularityState, RecipePopularity
+from recipes.popularity import refresh_popularity
+
+
+def favorites_count(recipe):
+    return RecipePopularity.objects.get(recipe=recipe).favorites_count
+
+
+@pytest.mark.django_db
+def test_recent_events_wait_for_lag_window(user, recipes):
+    refresh_popularity(full=True)
+    favorite = Favorite.objects.create(user=user, recipe=recipes[0])
+    refresh_popularity()
+    assert favorites_count(recipes[0]) == 0
+
+    # Окно сдвинулось: событие старше отметки прошлого пересчёта,
+    # но ещё не учтено.
+    events_until = PopularityState.objects.get().events_until
+    Favorite.objects.filter(pk=favorite.pk).update(
+        created_at=events_until + timedelta(microseconds=1)
+    )
+    refresh_popularity()
+    assert favorites_count(recipes[0]) == 1
+
+    refresh_popularity()
+    assert favorites_count(recipes[0]) == 1
+
+
+@pytest.mark.django_db
+def test_unfavorite_applied_incrementally(settings, user, recipes):
+    settings.RECIPE_CHANGES_LAG = 0
+    favorite = Favorite.objects.create(user=user, recipe=recipes[0])
+    refresh_popularity(full=True)
+    assert favorites_count(recipes[0]) == 1
+
+    favorite.delete()
+    refresh_popularity()
+    assert favorites_count(recipes[0]) == 0
+    assert RecipePopularity.objects.get(recipe=recipes[0]).trending == (
+        pytest.approx(0)
+    )
+
+
+@pytest.mark.django_db
+def test_old_epoch_is_rebased(settings, user, recipes):
+    settings.RECIPE_CHANGES_LAG = 0
+    refresh_popularity(full=True)
+    # Эпоха старше тысячи периодов полураспада: exp от неё переполнился бы.
+    PopularityState.objects.update(epoch=F('epoch') - timedelta(
+        hours=settings.POPULARITY_HALF_LIFE_HOURS * 2000
+    ))
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    refresh_popularity()
+    state = PopularityState.objects.get()
+    assert state.epoch == state.refreshed_at
+    assert favorites_count(recipes[0]) == 1
+    assert RecipePopularity.objects.get(recipe=recipes[0]).trending > 0
@@ -0,0 +1,47 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Favorite
+from tests.conftest import create_recipe
+from users.models import Subscription
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='быстрый путь собирает JSON в PostgreSQL',
+)
+
+RECIPES_URL = '/api/recipes/'
+
+
+def bodies(settings, client, url):
+    """Тела ответа без быстрого пути и с ним."""
+    settings.RECIPE_JSON_FAST_PATH = False
+    expected = client.get(url)
+    settings.RECIPE_JSON_FAST_PATH = True
+    actual = client.get(url)
+    assert expected.status_code == actual.status_code == 200
+    return expected.content, actual.content
+
+
+@pytest.mark.django_db
+def test_list_bytes_match_serializer(
+    settings, client, user, recipes, ingredients
+):
+    create_recipe(
+        user, 'Суп "домашний"\n', ingredients=ingredients,
+        image='recipes/2.png',
+    )
+    expected, actual = bodies(settings, client, RECIPES_URL)
+    assert actual == expected
+
+
+@pytest.mark.django_db
+def test_detail_bytes_match_serializer(
+    settings, user_client, user, author, recipes
+):
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    Subscription.objects.create(user=user, author=author)
+    expected, actual = bodies(
+        settings, user_client, f'{RECIPES_URL}{recipes[0].pk}/'
+    )
+    assert actual == expected
@@ -0,0 +1,26 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from rest_framework.request import Request
+
+from api.views import RecipesViewSet
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica_0']
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.parametrize('action, replica', (
+    ('list', True),
+    ('retrieve', True),
+    ('changes', False),
+))
+def test_changes_feed_reads_primary(rf, replicas, action, replica):
+    request = Request(rf.get('/api/recipes/'))
+    request.user = AnonymousUser()
+    view = RecipesViewSet(action=action)
+    assert view.can_read_replica(request) is replica
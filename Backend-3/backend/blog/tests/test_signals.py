@@ -0,0 +1,32 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def recipe_queries(context):
+    return [
+        query['sql'] for query in context.captured_queries
+        if 'recipes_recipe' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+def test_signup_does_not_look_up_author_recipes(django_user_model):
+    with CaptureQueriesContext(connection) as context:
+        django_user_model.objects.create_user(
+            username='new', email='new@example.com', password='password',
+        )
+    assert recipe_queries(context) == []
+
+
+@pytest.mark.django_db
+def test_only_author_fields_invalidate_cards(author, recipes):
+    with CaptureQueriesContext(connection) as context:
+        author.is_staff = True
+        author.save(update_fields=('is_staff',))
+    assert recipe_queries(context) == []
+
+    with CaptureQueriesContext(connection) as context:
+        author.first_name = 'Мария'
+        author.save(update_fields=('first_name',))
+    assert recipe_queries(context)
@@ -0,0 +1,65 @@
+import pytest
+
+from recipes.models import Ingredient, RecipeIngredient, SimilarRecipe
+from recipes.similarity import build_full, build_incremental
+from tests.conftest import create_recipe
+
+
+@pytest.fixture
+def pantry():
+    return [
+        Ingredient.objects.create(
+            name=f'ингредиент {number}', measurement_unit='г'
+        )
+        for number in range(30)
+    ]
+
+
+@pytest.fixture
+def dishes(author, pantry):
+    return {
+        'борщ': create_recipe(author, 'Борщ', ingredients=pantry[:8]),
+        'щи': create_recipe(author, 'Щи', ingredients=pantry[1:9]),
+        'сырники': create_recipe(author, 'Сырники', ingredients=pantry[20:26]),
+    }
+
+
+def similar_ids(recipe):
+    return set(SimilarRecipe.objects.filter(
+        recipe=recipe
+    ).values_list('similar_id', flat=True))
+
+
+def neighbours():
+    return {
+        (recipe_id, similar_id, round(score, 6))
+        for recipe_id, similar_id, score in SimilarRecipe.objects.values_list(
+            'recipe_id', 'similar_id', 'score'
+        )
+    }
+
+
+@pytest.mark.django_db
+def test_near_duplicates_are_similar(dishes):
+    build_full()
+    assert dishes['щи'].pk in similar_ids(dishes['борщ'])
+    assert dishes['борщ'].pk in similar_ids(dishes['щи'])
+    assert dishes['сырники'].pk not in similar_ids(dishes['борщ'])
+    assert similar_ids(dishes['сырники']) == set()
+
+
+@pytest.mark.django_db
+def test_incremental_build_matches_full(author, pantry, dishes):
+    build_full()
+    create_recipe(author, 'Творожники', ingredients=pantry[21:27])
+    RecipeIngredient.objects.filter(recipe=dishes['щи']).delete()
+    for ingredient in pantry[20:25]:
+        RecipeIngredient.objects.create(
+            recipe=dishes['щи'], ingredient=ingredient, amount=1
+        )
+
+    assert build_incremental() == 2
+    incremental = neighbours()
+    build_full()
+    assert incremental == neighbours()
+    assert dishes['щи'].pk not in similar_ids(dishes['борщ'])
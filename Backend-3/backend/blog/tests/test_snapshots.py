@@ -0,0 +1,28 @@
+import pytest
+
+from api.snapshots import bump_data_version
+from recipes.models import Tag
+
+TAGS_URL = '/api/tags/'
+
+
+@pytest.mark.django_db
+def test_tag_save_replaces_snapshot(client, tags):
+    etag = client.get(TAGS_URL)['ETag']
+    tags[0].name = 'Поздний завтрак'
+    tags[0].save()
+    response = client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_write_from_another_process_replaces_snapshot(client, tags):
+    etag = client.get(TAGS_URL)['ETag']
+    # Другой процесс: его кэш и сигналы этому процессу не видны,
+    # общая только БД.
+    Tag.objects.filter(pk=tags[0].pk).update(name='Поздний завтрак')
+    bump_data_version('tags')
+    response = client.get(TAGS_URL)
+    assert response['ETag'] != etag
+    assert 'Поздний завтрак' in response.content.decode()
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+from django.db import connection, transaction
+from django.db.utils import load_backend
+
+
+@pytest.fixture
+def tuned(tmp_path, django_db_blocker):
+    """Отдельный файл БД: тестовая база открыта обычным бэкендом."""
+    backend = load_backend('blog.backends.sqlite_tuned')
+    wrapper = backend.DatabaseWrapper({
+        **connection.settings_dict,
+        'ENGINE': 'blog.backends.sqlite_tuned',
+        'NAME': str(tmp_path / 'tuned.sqlite3'),
+        'OPTIONS': {'pragmas': {'cache_size': -1024}},
+        'TEST': {},
+    }, alias='tuned')
+    with django_db_blocker.unblock():
+        yield wrapper
+        wrapper.close()
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def test_pragmas_applied_on_connect(tuned):
+    assert pragma(tuned, 'journal_mode') == 'wal'
+    # NORMAL
+    assert pragma(tuned, 'synchronous') == 1
+    assert pragma(tuned, 'busy_timeout') == 5000
+    assert pragma(tuned, 'cache_size') == -1024
+
+
+def test_atomic_takes_write_lock_immediately(tuned, monkeypatch):
+    monkeypatch.setattr(transaction, 'get_connection', lambda using: tuned)
+    tuned.ensure_connection()
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append(sql)
+        return execute(sql, params, many, context)
+
+    with tuned.execute_wrapper(record), transaction.atomic():
+        tuned.cursor().execute('SELECT 1')
+        # Блокировка на запись уже взята, хотя транзакция только читала.
+        other = sqlite3.connect(tuned.settings_dict['NAME'], timeout=0)
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            other.execute('BEGIN IMMEDIATE')
+        other.close()
+    assert statements[0] == 'BEGIN IMMEDIATE'
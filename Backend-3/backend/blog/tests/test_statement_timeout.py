@@ -0,0 +1,44 @@
+import pytest
+from django.db import OperationalError
+from rest_framework.test import APIClient
+
+from api.middleware import QUERY_CANCELED
+from api.views import RecipesViewSet
+
+
+class QueryCanceled(Exception):
+    """Как psycopg2.errors.QueryCanceled: код ошибки в pgcode."""
+
+    pgcode = QUERY_CANCELED
+
+
+def cancel(*args, **kwargs):
+    # Django оборачивает ошибку драйвера, оставляя её в __cause__.
+    try:
+        raise QueryCanceled('canceling statement due to statement timeout')
+    except QueryCanceled as error:
+        raise OperationalError(str(error)) from error
+
+
+@pytest.mark.django_db
+def test_canceled_query_returns_503(settings, monkeypatch, recipes):
+    settings.STATEMENT_TIMEOUT_ENABLED = True
+    settings.STATEMENT_TIMEOUT_RETRY_AFTER = 7
+    monkeypatch.setattr(RecipesViewSet, 'list', cancel)
+
+    response = APIClient().get('/api/recipes/')
+
+    assert response.status_code == 503
+    assert response['Retry-After'] == '7'
+
+
+@pytest.mark.django_db
+def test_other_operational_errors_propagate(settings, monkeypatch, recipes):
+    settings.STATEMENT_TIMEOUT_ENABLED = True
+
+    def fail(*args, **kwargs):
+        raise OperationalError('database is locked')
+
+    monkeypatch.setattr(RecipesViewSet, 'list', fail)
+    with pytest.raises(OperationalError):
+        APIClient().get('/api/recipes/')
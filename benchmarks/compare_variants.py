@@ -0,0 +1,436 @@
+"""
+Сравнение производительности вариантов Backend-1..4.
+
+Каждый вариант поднимается в отдельном процессе со своими settings.py,
+но с одинаковой временной базой SQLite, одинаковым сгенерированным
+набором данных и одинаковой последовательностью запросов. Для каждого
+эндпоинта измеряются задержка (p50/p95), количество SQL-запросов,
+пиковое потребление памяти и размер ответа.
+
+Запуск из корня репозитория:
+
+    python benchmarks/compare_variants.py
+    python benchmarks/compare_variants.py --variants Backend-1 Backend-3 \
+        --recipes 5000 --repeat 30 --json-out report.json
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTS = ('Backend-1', 'Backend-2', 'Backend-3', 'Backend-4')
+LOCAL_APPS = ('users', 'recipes', 'api')
+PAGE_SIZE = 6
+WORKER_OPTIONS = (
+    'users', 'recipes', 'tags', 'ingredients_per_recipe',
+    'favorites_per_user', 'cart_per_user', 'subscriptions_per_user',
+    'repeat', 'warmup', 'seed',
+)
+
+# Логический набор запросов. Пагинация задаётся номером страницы и
+# переводится в параметры конкретного варианта (page/limit или
+# limit/offset), чтобы все варианты отдавали одну и ту же выборку.
+SCENARIOS = (
+    ('recipes_list', 'GET', '/api/recipes/', {'page': 1}, False),
+    ('recipes_list_deep', 'GET', '/api/recipes/', {'page': 'last'}, False),
+    ('recipes_list_auth', 'GET', '/api/recipes/', {'page': 1}, True),
+    ('recipes_by_tags', 'GET', '/api/recipes/',
+     {'page': 1, 'tags': ['tag-0', 'tag-1']}, False),
+    ('recipes_favorited', 'GET', '/api/recipes/',
+     {'page': 1, 'is_favorited': 1}, True),
+    ('recipes_in_cart', 'GET', '/api/recipes/',
+     {'page': 1, 'is_in_shopping_cart': 1}, True),
+    ('recipe_detail', 'GET', '/api/recipes/{recipe_id}/', {}, False),
+    ('recipe_detail_auth', 'GET', '/api/recipes/{recipe_id}/', {}, True),
+    ('tags_list', 'GET', '/api/tags/', {}, False),
+    ('ingredients_list', 'GET', '/api/ingredients/', {}, False),
+    ('ingredients_search', 'GET', '/api/ingredients/', {'name': 'сах'}, False),
+    ('users_list', 'GET', '/api/users/', {'page': 1}, False),
+    ('subscriptions', 'GET', '/api/users/subscriptions/',
+     {'page': 1, 'recipes_limit': 3}, True),
+    ('download_shopping_cart', 'GET',
+     '/api/recipes/download_shopping_cart/', {}, True),
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Сравнение производительности вариантов бэкенда.'
+    )
+    parser.add_argument('--variants', nargs='+', default=list(VARIANTS))
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--tags', type=int, default=8)
+    parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+    parser.add_argument('--favorites-per-user', type=int, default=20)
+    parser.add_argument('--cart-per-user', type=int, default=10)
+    parser.add_argument('--subscriptions-per-user', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json-out', help='Сохранить полный отчёт в JSON.')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# --- Рабочий процесс: один вариант ------------------------------------------
+
+def configure_django(variant, workdir):
+    """Подключает settings.py варианта поверх временной базы SQLite."""
+    blog_dir = os.path.join(REPO_ROOT, variant, 'backend', 'blog')
+    sys.path.insert(0, blog_dir)
+    os.chdir(blog_dir)
+
+    base = importlib.import_module('blog.settings')
+    bench = types.ModuleType('bench_settings')
+    bench.__dict__.update(
+        {key: value for key, value in vars(base).items() if key.isupper()}
+    )
+    bench.DEBUG = False
+    bench.ALLOWED_HOSTS = ['*']
+    bench.DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(workdir, 'bench.sqlite3'),
+        }
+    }
+    # Миграции в вариантах расходятся с моделями, поэтому схема
+    # создаётся напрямую по текущим моделям.
+    bench.MIGRATION_MODULES = {app: None for app in LOCAL_APPS}
+    bench.PASSWORD_HASHERS = [
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ]
+    bench.MEDIA_ROOT = os.path.join(workdir, 'media')
+    sys.modules['bench_settings'] = bench
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'bench_settings'
+
+    import django
+    django.setup()
+
+
+def get_model(apps, *names):
+    for name in names:
+        try:
+            return apps.get_model('recipes', name)
+        except LookupError:
+            continue
+    raise LookupError(f'Нет ни одной из моделей: {", ".join(names)}')
+
+
+def fk_name(model, related_model):
+    for field in model._meta.get_fields():
+        if (field.many_to_one and field.concrete
+                and field.related_model is related_model):
+            return field.name
+    raise LookupError(f'{model.__name__} -> {related_model.__name__}')
+
+
+def resolve_models():
+    """Сопоставляет модели варианта с логическими сущностями."""
+    from django.apps import apps
+    from django.contrib.auth import get_user_model
+
+    recipe = get_model(apps, 'Recipe', 'Recipes')
+    ingredient = get_model(apps, 'Ingredient', 'Ingredients')
+    recipe_ingredient = get_model(
+        apps, 'RecipeIngredient', 'RecipesIngridientsRelation'
+    )
+    return {
+        'user': get_user_model(),
+        'recipe': recipe,
+        'ingredient': ingredient,
+        'tag': get_model(apps, 'Tag'),
+        'recipe_ingredient': recipe_ingredient,
+        'recipe_ingredient_fk': fk_name(recipe_ingredient, ingredient),
+        'favorite': get_model(apps, 'Favorite'),
+        'cart': get_model(apps, 'ShoppingCart', 'ShoppingList'),
+        'subscription': apps.get_model('users', 'Subscription')
+        if 'subscription' in apps.all_models['users']
+        else apps.get_model('users', 'Follows'),
+    }
+
+
+def generate_dataset(models, options):
+    """
+    Создаёт детерминированный набор данных: при одинаковом seed
+    во всех вариантах получаются одни и те же первичные ключи.
+    """
+    from django.contrib.auth.hashers import make_password
+    from rest_framework.authtoken.models import Token
+
+    rnd = random.Random(options.seed)
+    with open(
+        os.path.join('data', 'ingredients.json'), encoding='utf8'
+    ) as file:
+        raw_ingredients = json.load(file)
+
+    password = make_password('bench-password')
+    models['user'].objects.bulk_create(
+        models['user'](
+            username=f'user{i}',
+            email=f'user{i}@example.com',
+            first_name=f'Имя{i}',
+            last_name=f'Фамилия{i}',
+            password=password,
+        ) for i in range(options.users)
+    )
+    users = list(models['user'].objects.order_by('id'))
+    Token.objects.bulk_create(
+        Token(key=f'{user.id:040d}', user=user) for user in users
+    )
+
+    models['tag'].objects.bulk_create(
+        models['tag'](
+            name=f'Тег {i}', color=f'#{i:06X}', slug=f'tag-{i}'
+        ) for i in range(options.tags)
+    )
+    tags = list(models['tag'].objects.order_by('id'))
+    models['ingredient'].objects.bulk_create(
+        models['ingredient'](**item) for item in raw_ingredients
+    )
+    ingredient_ids = list(
+        models['ingredient'].objects.order_by('id')
+        .values_list('id', flat=True)
+    )
+
+    models['recipe'].objects.bulk_create(
+        models['recipe'](
+            author=rnd.choice(users),
+            name=f'Рецепт {i}',
+            text='Описание рецепта. ' * rnd.randint(5, 40),
+            image=f'recipes/images/{i}.png',
+            cooking_time=rnd.randint(1, 240),
+        ) for i in range(options.recipes)
+    )
+    recipe_ids = list(
+        models['recipe'].objects.order_by('id').values_list('id', flat=True)
+    )
+
+    tag_through = models['recipe'].tags.through
+    models['recipe_ingredient'].objects.bulk_create(
+        models['recipe_ingredient'](
+            recipe_id=recipe_id,
+            amount=rnd.randint(1, 500),
+            **{f"{models['recipe_ingredient_fk']}_id": ingredient_id}
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in rnd.sample(
+            ingredient_ids, options.ingredients_per_recipe
+        )
+    )
+    recipe_fk = fk_name(tag_through, models['recipe'])
+    tag_fk = fk_name(tag_through, models['tag'])
+    tag_through.objects.bulk_create(
+        tag_through(**{f'{recipe_fk}_id': recipe_id, f'{tag_fk}_id': tag.id})
+        for recipe_id in recipe_ids
+        for tag in rnd.sample(tags, rnd.randint(1, 3))
+    )
+
+    for model, per_user in (
+        (models['favorite'], options.favorites_per_user),
+        (models['cart'], options.cart_per_user),
+    ):
+        model.objects.bulk_create(
+            model(user=user, recipe_id=recipe_id)
+            for user in users
+            for recipe_id in rnd.sample(recipe_ids, per_user)
+        )
+    models['subscription'].objects.bulk_create(
+        models['subscription'](user=user, author=author)
+        for user in users
+        for author in rnd.sample(
+            [other for other in users if other != user],
+            options.subscriptions_per_user,
+        )
+    )
+    return {
+        'users': [user.id for user in users],
+        'recipe_ids': recipe_ids,
+    }
+
+
+def pagination_style():
+    from django.urls import resolve
+    from rest_framework.pagination import LimitOffsetPagination
+
+    view = resolve('/api/recipes/').func
+    paginator = getattr(view.cls, 'pagination_class', None)
+    if paginator and issubclass(paginator, LimitOffsetPagination):
+        return 'offset'
+    return 'page'
+
+
+def build_params(params, style, total):
+    params = dict(params)
+    page = params.pop('page', None)
+    if page == 'last':
+        page = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+    if page is not None:
+        if style == 'offset':
+            params.update(limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)
+        else:
+            params.update(page=page, limit=PAGE_SIZE)
+    return params
+
+
+def measure(client, method, path, params, headers):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    request = getattr(client, method.lower())
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = request(path, params, **headers)
+        elapsed = time.perf_counter() - started
+    return response, elapsed, len(queries)
+
+
+def run_scenarios(dataset, options):
+    from django.test import Client
+
+    client = Client(raise_request_exception=False)
+    style = pagination_style()
+    rnd = random.Random(options.seed)
+    results = {}
+    for name, method, path, params, auth in SCENARIOS:
+        user_id = rnd.choice(dataset['users'])
+        recipe_id = rnd.choice(dataset['recipe_ids'])
+        url = path.format(recipe_id=recipe_id)
+        query = build_params(params, style, len(dataset['recipe_ids']))
+        headers = (
+            {'HTTP_AUTHORIZATION': f'Token {user_id:040d}'} if auth else {}
+        )
+        try:
+            for _ in range(options.warmup):
+                measure(client, method, url, query, headers)
+            timings = []
+            for _ in range(options.repeat):
+                response, elapsed, queries = measure(
+                    client, method, url, query, headers
+                )
+                timings.append(elapsed * 1000)
+            tracemalloc.start()
+            measure(client, method, url, query, headers)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        except Exception as error:
+            results[name] = {'error': f'{type(error).__name__}: {error}'}
+            continue
+        timings.sort()
+        results[name] = {
+            'status': response.status_code,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+            'queries': queries,
+            'peak_kib': round(peak / 1024, 1),
+            'bytes': len(response.content),
+        }
+    return {'pagination': style, 'results': results}
+
+
+def run_worker(options):
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            configure_django(options.worker, workdir)
+            from django.core.management import call_command
+
+            call_command('migrate', run_syncdb=True, verbosity=0)
+            models = resolve_models()
+            dataset = generate_dataset(models, options)
+            report = run_scenarios(dataset, options)
+        except Exception as error:
+            report = {'error': f'{type(error).__name__}: {error}'}
+    with open(options.result_file, 'w', encoding='utf8') as file:
+        json.dump(report, file, ensure_ascii=False)
+
+
+# --- Управляющий процесс ----------------------------------------------------
+
+def run_variant(variant, argv):
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as file:
+        result_file = file.name
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *argv,
+             '--worker', variant, '--result-file', result_file],
+            capture_output=True, text=True,
+        )
+        try:
+            with open(result_file, encoding='utf8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            stderr = completed.stderr.strip().splitlines()
+            return {'error': stderr[-1] if stderr else 'worker failed'}
+    finally:
+        os.unlink(result_file)
+
+
+def format_cell(result):
+    if result is None:
+        return '-'
+    if 'error' in result:
+        return 'error'
+    cell = (f"{result['p50_ms']:.1f}ms {result['queries']}q "
+            f"{result['peak_kib']:.0f}KiB")
+    if result['status'] >= 400:
+        cell += f" [{result['status']}]"
+    return cell
+
+
+def print_report(report):
+    variants = list(report)
+    rows = [['endpoint', *variants]]
+    rows.append(['pagination', *(
+        report[variant].get('pagination', '-') for variant in variants
+    )])
+    for name, *_ in SCENARIOS:
+        rows.append([name, *(
+            format_cell(report[variant].get('results', {}).get(name))
+            for variant in variants
+        )])
+    widths = [max(len(row[col]) for row in rows) for col in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+    for variant in variants:
+        if 'error' in report[variant]:
+            print(f'\n{variant}: {report[variant]["error"]}')
+        for name, result in report[variant].get('results', {}).items():
+            if 'error' in result:
+                print(f'\n{variant} {name}: {result["error"]}')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = parse_args(argv)
+    if options.worker:
+        return run_worker(options)
+
+    worker_argv = []
+    for option in WORKER_OPTIONS:
+        worker_argv += [
+            '--' + option.replace('_', '-'), str(getattr(options, option))
+        ]
+
+    report = {}
+    for variant in options.variants:
+        print(f'Запуск {variant}...', file=sys.stderr)
+        report[variant] = run_variant(variant, worker_argv)
+    print_report(report)
+    if options.json_out:
+        with open(options.json_out, 'w', encoding='utf8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()